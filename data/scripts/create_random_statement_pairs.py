@@ -1,15 +1,92 @@
 import os
-import json
-import random
-from typing import Dict, List, Tuple
+import orjson
+import numpy as np
+from typing import Dict, Iterator, List, Tuple
 from tqdm import tqdm
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import shared_memory
+from statements import JDStatement, SkillStatement, _write_pairs_stream
 
-def load_all_statements(jd_path: str, resume_path: str) -> Tuple[List[Dict], List[Dict]]:
+_SPACE_TO_UNDERSCORE = str.maketrans(' ', '_')
+
+def _extract_job_type(data: Dict) -> str:
+    """Get the normalized job type from the last 'Job Title:' line of a JD's job info"""
+    job_type = 'unknown'
+    for info in data.get('job_info', []):
+        if info.startswith('Job Title:'):
+            # Only the text up to a second ':' names the job type
+            job_type = info.split(':')[1].strip().lower().translate(_SPACE_TO_UNDERSCORE)
+    return job_type
+
+def _parse_jd_file(path: str, jd_fields: List[str]) -> List[JDStatement]:
+    """Parse a single job description file into statements with metadata"""
+    jd_statements = []
+    with open(path, 'rb') as f:
+        try:
+            data = orjson.loads(f.read())
+            jd_id = os.path.basename(path).split('.')[0]
+            
+            job_type = _extract_job_type(data)
+            
+            # Collect all statements with metadata
+            for field in jd_fields:
+                if field in data:
+                    for stmt in data[field]:
+                        jd_statements.append(JDStatement(
+                            statement=stmt,
+                            jd_id=jd_id,
+                            job_type=job_type,
+                            category=field
+                        ))
+        except orjson.JSONDecodeError:
+            print(f"Error reading file: {os.path.basename(path)}")
+    
+    return jd_statements
+
+def _walk_json(root: str) -> Iterator[str]:
+    """Recursively yield JSON file paths under root using os.scandir"""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk_json(entry.path)
+            elif entry.name.endswith('.json'):
+                yield entry.path
+
+def _parse_resume_file(path: str) -> List[SkillStatement]:
+    """Parse a single resume file into skill statements with metadata"""
+    skill_statements = []
+    try:
+        with open(path, 'rb') as f:
+            data = orjson.loads(f.read())
+            resume_id = Path(path).stem
+            resume_type = Path(path).parent.name
+            
+            if 'skills' in data:
+                for skill in data['skills']:
+                    if 'description' in skill:
+                        skill_statements.append(SkillStatement(
+                            statement=skill['description'],
+                            resume_id=resume_id,
+                            resume_type=resume_type,
+                            skill_name=skill['name'],
+                            skill_level=skill.get('level', 'Not specified'),
+                            skill_years=skill.get('years', 0),
+                            evidence_count=len(skill.get('evidence', []))
+                        ))
+    except orjson.JSONDecodeError:
+        print(f"Error reading file: {path}")
+    
+    return skill_statements
+
+def load_all_statements(jd_path: str, resume_path: str) -> Tuple[List[JDStatement], List[SkillStatement]]:
     """
     Load all statements from job descriptions and resumes efficiently
     
+    Files are parsed in parallel across a process pool since each file is independent.
+    
     Returns:
         Tuple of (jd_statements, skill_statements) where each statement includes full metadata
     """
@@ -23,109 +100,170 @@ def load_all_statements(jd_path: str, resume_path: str) -> Tuple[List[Dict], Lis
         'educational_requirements'
     ]
     
-    # Load JD statements
-    jd_statements = []
-    print("\nLoading job description statements...")
-    for filename in tqdm([f for f in os.listdir(jd_path) if f.endswith('.json')]):
-        with open(os.path.join(jd_path, filename), 'r', encoding='utf-8') as f:
-            try:
-                data = json.load(f)
-                jd_id = filename.split('.')[0]
-                
-                # Get job type from job info
-                job_type = 'unknown'
-                if 'job_info' in data:
-                    for info in data['job_info']:
-                        if info.startswith('Job Title:'):
-                            job_type = info.split(':')[1].strip().lower().replace(' ', '_')
-                
-                # Collect all statements with metadata
-                for field in jd_fields:
-                    if field in data:
-                        for stmt in data[field]:
-                            jd_statements.append({
-                                'statement': stmt,
-                                'jd_id': jd_id,
-                                'job_type': job_type,
-                                'category': field
-                            })
-            except json.JSONDecodeError:
-                print(f"Error reading file: {filename}")
-                continue
-    
-    # Load resume skill statements
-    skill_statements = []
-    print("\nLoading resume skill statements...")
-    for root, _, files in os.walk(resume_path):
-        for file in tqdm(files):
-            if file.endswith('.json'):
-                filepath = os.path.join(root, file)
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        resume_id = Path(filepath).stem
-                        resume_type = Path(filepath).parent.name
-                        
-                        if 'skills' in data:
-                            for skill in data['skills']:
-                                if 'description' in skill:
-                                    skill_statements.append({
-                                        'statement': skill['description'],
-                                        'resume_id': resume_id,
-                                        'resume_type': resume_type,
-                                        'skill_name': skill['name'],
-                                        'skill_level': skill.get('level', 'Not specified'),
-                                        'skill_years': skill.get('years', 0),
-                                        'evidence_count': len(skill.get('evidence', []))
-                                    })
-                except json.JSONDecodeError:
-                    print(f"Error reading file: {filepath}")
-                    continue
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        # Load JD statements
+        jd_statements = []
+        print("\nLoading job description statements...")
+        with os.scandir(jd_path) as entries:
+            jd_files = [entry.path for entry in entries if entry.name.endswith('.json')]
+        parse_jd = partial(_parse_jd_file, jd_fields=jd_fields)
+        for result in tqdm(executor.map(parse_jd, jd_files, chunksize=32), total=len(jd_files)):
+            jd_statements.extend(result)
+        
+        # Load resume skill statements
+        skill_statements = []
+        print("\nLoading resume skill statements...")
+        resume_files = list(_walk_json(resume_path))
+        for result in tqdm(executor.map(_parse_resume_file, resume_files, chunksize=32), total=len(resume_files)):
+            skill_statements.extend(result)
     
     return jd_statements, skill_statements
 
-def create_random_pairs(jd_statements: List[Dict], 
-                       skill_statements: List[Dict], 
-                       num_pairs: int) -> List[Dict]:
+def _jd_fragments(jd_stmt: JDStatement) -> Tuple[bytes, bytes]:
+    """Encode the JSON fragments a JD statement contributes to every pair it appears in"""
+    return orjson.dumps(jd_stmt.statement), orjson.dumps({
+        'id': jd_stmt.jd_id,
+        'job_type': jd_stmt.job_type,
+        'category': jd_stmt.category
+    })
+
+def _skill_fragments(skill_stmt: SkillStatement) -> Tuple[bytes, bytes]:
+    """Encode the JSON fragments a skill statement contributes to every pair it appears in"""
+    return orjson.dumps(skill_stmt.statement), orjson.dumps({
+        'id': skill_stmt.resume_id,
+        'type': skill_stmt.resume_type,
+        'skill_name': skill_stmt.skill_name,
+        'skill_level': skill_stmt.skill_level,
+        'skill_years': skill_stmt.skill_years,
+        'evidence_count': skill_stmt.evidence_count
+    })
+
+class _SharedColumn:
+    """
+    A column of byte strings packed into shared memory as one data blob plus offsets
+    
+    Worker processes attach by name and slice fragments out without any copy
+    or unpickling of the original statement objects.
+    """
+    
+    def __init__(self, data_name: str, offsets_name: str, length: int):
+        self._data = shared_memory.SharedMemory(name=data_name)
+        self._offsets_shm = shared_memory.SharedMemory(name=offsets_name)
+        self.offsets = np.ndarray((length + 1,), dtype=np.int64, buffer=self._offsets_shm.buf)
+        self.buf = self._data.buf
+    
+    @classmethod
+    def create(cls, fragments: List[bytes]) -> '_SharedColumn':
+        offsets = np.zeros(len(fragments) + 1, dtype=np.int64)
+        np.cumsum([len(fragment) for fragment in fragments], out=offsets[1:])
+        
+        data = shared_memory.SharedMemory(create=True, size=max(int(offsets[-1]), 1))
+        data.buf[:offsets[-1]] = b''.join(fragments)
+        offsets_shm = shared_memory.SharedMemory(create=True, size=offsets.nbytes)
+        np.ndarray(offsets.shape, dtype=np.int64, buffer=offsets_shm.buf)[:] = offsets
+        
+        column = cls(data.name, offsets_shm.name, len(fragments))
+        data.close()
+        offsets_shm.close()
+        return column
+    
+    @property
+    def spec(self) -> Tuple[str, str, int]:
+        """Arguments needed to attach to this column from another process"""
+        return self._data.name, self._offsets_shm.name, len(self)
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def take(self, indices: np.ndarray) -> List[bytes]:
+        """Gather the fragments at `indices` using vectorized offset lookups"""
+        starts = self.offsets[indices].tolist()
+        ends = self.offsets[indices + 1].tolist()
+        buf = self.buf
+        return [bytes(buf[start:end]) for start, end in zip(starts, ends)]
+    
+    def close(self, unlink: bool = False):
+        del self.offsets, self.buf
+        self._data.close()
+        self._offsets_shm.close()
+        if unlink:
+            self._data.unlink()
+            self._offsets_shm.unlink()
+
+# Columns attached in each worker process by _init_pair_worker
+_worker_columns: Dict[str, _SharedColumn] = {}
+
+def _init_pair_worker(specs: Dict[str, Tuple[str, str, int]]):
+    for name, spec in specs.items():
+        _worker_columns[name] = _SharedColumn(*spec)
+
+def _encode_pairs_chunk(seed: np.random.SeedSequence, size: int) -> bytes:
+    """
+    Draw `size` random pairs and return them JSON-encoded and comma-joined
+    
+    Pairs are assembled from the pre-encoded fragments, producing exactly the
+    bytes orjson would emit for the equivalent pair dict.
+    """
+    jd_text, jd_meta = _worker_columns['jd_text'], _worker_columns['jd_meta']
+    skill_text, skill_meta = _worker_columns['skill_text'], _worker_columns['skill_meta']
+    
+    # Draw all JD and skill indices at once instead of one random.choice per pair
+    rng = np.random.default_rng(seed)
+    jd_idx = rng.integers(0, len(jd_text), size=size)
+    skill_idx = rng.integers(0, len(skill_text), size=size)
+    
+    # Gather each output column in one pass, then stitch the columns row-wise
+    columns = zip(jd_text.take(jd_idx), skill_text.take(skill_idx),
+                  jd_meta.take(jd_idx), skill_meta.take(skill_idx))
+    return b',\n'.join(
+        b'{"jd_statement":' + jd_stmt
+        + b',"skill_statement":' + skill_stmt
+        + b',"metadata":{"jd":' + jd_m
+        + b',"resume":' + skill_m + b'}}'
+        for jd_stmt, skill_stmt, jd_m, skill_m in columns
+    )
+
+def create_random_pairs(jd_statements: List[JDStatement], 
+                       skill_statements: List[SkillStatement], 
+                       num_pairs: int,
+                       chunk_size: int = 10000) -> Iterator[bytes]:
     """
-    Create completely random statement pairs
+    Create completely random statement pairs in parallel
+    
+    Statements are encoded once into shared memory so workers can build pairs
+    without pickling the statement lists. Each worker samples with its own
+    independent random stream and returns its chunk already JSON-encoded; chunks
+    are yielded in order so they can be streamed straight to disk.
     
     Args:
         jd_statements: List of all JD statements with metadata
         skill_statements: List of all skill statements with metadata
         num_pairs: Number of random pairs to create
+        chunk_size: Number of pairs generated per worker task
     """
-    pairs = []
-    
     print(f"\nCreating {num_pairs:,} random statement pairs...")
-    for _ in tqdm(range(num_pairs), desc="Creating pairs"):
-        # Randomly select one JD statement and one skill statement
-        jd_stmt = random.choice(jd_statements)
-        skill_stmt = random.choice(skill_statements)
-        
-        pair = {
-            'jd_statement': jd_stmt['statement'],
-            'skill_statement': skill_stmt['statement'],
-            'metadata': {
-                'jd': {
-                    'id': jd_stmt['jd_id'],
-                    'job_type': jd_stmt['job_type'],
-                    'category': jd_stmt['category']
-                },
-                'resume': {
-                    'id': skill_stmt['resume_id'],
-                    'type': skill_stmt['resume_type'],
-                    'skill_name': skill_stmt['skill_name'],
-                    'skill_level': skill_stmt['skill_level'],
-                    'skill_years': skill_stmt['skill_years'],
-                    'evidence_count': skill_stmt['evidence_count']
-                }
-            }
-        }
-        
-        pairs.append(pair)
     
-    return pairs
+    jd_text, jd_meta = zip(*map(_jd_fragments, jd_statements))
+    skill_text, skill_meta = zip(*map(_skill_fragments, skill_statements))
+    columns = {
+        'jd_text': _SharedColumn.create(jd_text),
+        'jd_meta': _SharedColumn.create(jd_meta),
+        'skill_text': _SharedColumn.create(skill_text),
+        'skill_meta': _SharedColumn.create(skill_meta)
+    }
+    
+    sizes = [min(chunk_size, num_pairs - start) for start in range(0, num_pairs, chunk_size)]
+    seeds = np.random.SeedSequence().spawn(len(sizes))
+    
+    try:
+        specs = {name: column.spec for name, column in columns.items()}
+        with ProcessPoolExecutor(max_workers=os.cpu_count(),
+                                 initializer=_init_pair_worker, initargs=(specs,)) as executor:
+            chunks = executor.map(_encode_pairs_chunk, seeds, sizes)
+            yield from tqdm(chunks, total=len(sizes), desc="Creating pairs")
+    finally:
+        for column in columns.values():
+            column.close(unlink=True)
 
 def main():
     # Update these paths to match your directory structure
@@ -141,26 +279,21 @@ def main():
     
     print(f"\nLoaded {len(jd_statements):,} JD statements and {len(skill_statements):,} skill statements")
     
-    # Create random pairs
-    pairs = create_random_pairs(jd_statements, skill_statements, num_pairs)
-    
     # Create output directory
     os.makedirs(output_path, exist_ok=True)
     
-    # Save all pairs to a single file
+    # Create random pairs and stream them straight to a single file
     output_file = os.path.join(output_path, 'statement_pairs_random.json')
-    print("\nSaving pairs to file...")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            'total_pairs': len(pairs),
-            'sampling_params': {
-                'total_jd_statements': len(jd_statements),
-                'total_skill_statements': len(skill_statements),
-                'requested_pairs': num_pairs
-            },
-            'pairs': pairs
-        }, f, indent=2)
-    print(f"Saved {len(pairs):,} pairs to {output_file}")
+    chunks = create_random_pairs(jd_statements, skill_statements, num_pairs)
+    _write_pairs_stream(output_file, {
+        'total_pairs': num_pairs,
+        'sampling_params': {
+            'total_jd_statements': len(jd_statements),
+            'total_skill_statements': len(skill_statements),
+            'requested_pairs': num_pairs
+        }
+    }, chunks)
+    print(f"Saved {num_pairs:,} pairs to {output_file}")
     
     print("\nRandom pair creation complete!")
 
@@ -1,16 +1,18 @@
 import os
-import json
-from typing import Dict, List, Tuple
+import orjson
+from typing import Dict, Iterable, Iterator, List, Tuple
 from tqdm import tqdm
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from statements import JDStatement, SkillStatement, _write_pairs_stream
 
-def load_job_statements(jd_path: str) -> List[Dict]:
+def load_job_statements(jd_path: str) -> List[JDStatement]:
     """
     Load statements from specified job descriptions with metadata
     
     Returns:
-        List of dictionaries containing statements and their metadata
+        List of JDStatement records containing statements and their metadata
     """
     # Fields to analyze from job descriptions
     jd_fields = [
@@ -38,70 +40,95 @@ def load_job_statements(jd_path: str) -> List[Dict]:
             print(f"Warning: File not found: {filename}")
             continue
             
-        with open(filepath, 'r', encoding='utf-8') as f:
+        with open(filepath, 'rb') as f:
             try:
-                data = json.load(f)
+                data = orjson.loads(f.read())
                 jd_id = filename.split('.')[0]
                 
                 for field in jd_fields:
                     if field in data:
                         statements = data[field]
                         for stmt in statements:
-                            all_statements.append({
-                                'statement': stmt,
-                                'jd_id': jd_id,
-                                'job_type': job_type,
-                                'category': field
-                            })
-            except json.JSONDecodeError:
+                            all_statements.append(JDStatement(
+                                statement=stmt,
+                                jd_id=jd_id,
+                                job_type=job_type,
+                                category=field
+                            ))
+            except orjson.JSONDecodeError:
                 print(f"Error reading file: {filename}")
                 continue
     
     return all_statements
 
-def load_resume_statements(resume_path: str) -> List[Dict]:
+def _parse_resume_file(filepath: Path) -> List[SkillStatement]:
+    """Parse a single resume file into skill descriptions with metadata"""
+    skill_statements = []
+    try:
+        with open(filepath, 'rb') as f:
+            data = orjson.loads(f.read())
+            resume_id = filepath.stem
+            resume_type = filepath.parent.name
+            
+            if 'skills' in data:
+                for skill in data['skills']:
+                    if 'description' in skill:
+                        skill_statements.append(SkillStatement(
+                            statement=skill['description'],
+                            resume_id=resume_id,
+                            resume_type=resume_type,
+                            skill_name=skill['name'],
+                            skill_level=skill.get('level', 'Not specified'),
+                            skill_years=skill.get('years', 0),
+                            evidence_count=len(skill.get('evidence', []))
+                        ))
+    
+    except orjson.JSONDecodeError:
+        print(f"Error reading file: {filepath}")
+    
+    return skill_statements
+
+def load_resume_statements(resume_path: str) -> List[SkillStatement]:
     """
     Load skill descriptions from resumes with metadata
     
     Returns:
-        List of dictionaries containing skill descriptions and their metadata
+        List of SkillStatement records containing skill descriptions and their metadata
     """
     skill_statements = []
     
     # Get all JSON files recursively
-    json_files = []
-    for root, _, files in os.walk(resume_path):
-        for file in files:
-            if file.endswith('.json'):
-                json_files.append(os.path.join(root, file))
+    json_files = list(Path(resume_path).rglob('*.json'))
     
     print(f"\nProcessing {len(json_files)} resumes...")
-    for filepath in tqdm(json_files, desc="Loading resume statements"):
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                resume_id = Path(filepath).stem
-                resume_type = Path(filepath).parent.name
-                
-                if 'skills' in data:
-                    for skill in data['skills']:
-                        if 'description' in skill:
-                            skill_statements.append({
-                                'statement': skill['description'],
-                                'resume_id': resume_id,
-                                'resume_type': resume_type,
-                                'skill_name': skill['name'],
-                                'skill_level': skill.get('level', 'Not specified'),
-                                'skill_years': skill.get('years', 0),
-                                'evidence_count': len(skill.get('evidence', []))
-                            })
-        
-        except json.JSONDecodeError:
-            print(f"Error reading file: {filepath}")
-            continue
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(_parse_resume_file, json_files, chunksize=64)
+        for result in tqdm(results, total=len(json_files), desc="Loading resume statements"):
+            skill_statements.extend(result)
     
     return skill_statements
 
+def _iter_pairs(jd_statements: Iterable[JDStatement], resume_payloads: List[Tuple[str, Dict]]) -> Iterator[Dict]:
+    """Yield every pair between the given JD statements and prebuilt (statement, metadata) resume payloads"""
+    for jd_stmt in jd_statements:
+        # Hoist per-JD reads out of the inner loop; jd_meta is shared by all of its pairs
+        jd_stmt_text = jd_stmt.statement
+        jd_meta = {
+            'id': jd_stmt.jd_id,
+            'job_type': jd_stmt.job_type,
+            'category': jd_stmt.category
+        }
+        
+        for skill_stmt_text, resume_meta in resume_payloads:
+            yield {
+                'jd_statement': jd_stmt_text,
+                'skill_statement': skill_stmt_text,
+                'metadata': {
+                    'jd': jd_meta,
+                    'resume': resume_meta
+                }
+            }
+
 def create_statement_pairs(jd_path: str, resume_path: str, output_path: str):
     """Create all possible pairs between JD statements and resume skill descriptions"""
     
@@ -112,46 +139,35 @@ def create_statement_pairs(jd_path: str, resume_path: str, output_path: str):
     # Create output directory if it doesn't exist
     os.makedirs(output_path, exist_ok=True)
     
-    # Create pairs and save by job type
-    print("\nCreating statement pairs...")
-    pairs_by_job = defaultdict(list)
+    # Group JD statements by job type; each job type is written to its own file
+    jd_by_job = defaultdict(list)
+    for jd_stmt in jd_statements:
+        jd_by_job[jd_stmt.job_type].append(jd_stmt)
     
-    for jd_stmt in tqdm(jd_statements, desc="Creating pairs"):
-        job_type = jd_stmt['job_type']
-        
-        for resume_stmt in resume_statements:
-            pair = {
-                'jd_statement': jd_stmt['statement'],
-                'skill_statement': resume_stmt['statement'],
-                'metadata': {
-                    'jd': {
-                        'id': jd_stmt['jd_id'],
-                        'job_type': jd_stmt['job_type'],
-                        'category': jd_stmt['category']
-                    },
-                    'resume': {
-                        'id': resume_stmt['resume_id'],
-                        'type': resume_stmt['resume_type'],
-                        'skill_name': resume_stmt['skill_name'],
-                        'skill_level': resume_stmt['skill_level'],
-                        'skill_years': resume_stmt['skill_years'],
-                        'evidence_count': resume_stmt['evidence_count']
-                    }
-                }
-            }
-            pairs_by_job[job_type].append(pair)
+    # Resume-side payloads are identical for every JD statement, so build them once
+    resume_payloads = [
+        (resume_stmt.statement, {
+            'id': resume_stmt.resume_id,
+            'type': resume_stmt.resume_type,
+            'skill_name': resume_stmt.skill_name,
+            'skill_level': resume_stmt.skill_level,
+            'skill_years': resume_stmt.skill_years,
+            'evidence_count': resume_stmt.evidence_count
+        })
+        for resume_stmt in resume_statements
+    ]
     
-    # Save pairs to separate files by job type
-    print("\nSaving pairs to files...")
-    for job_type, pairs in pairs_by_job.items():
+    # Create pairs and stream them to separate files by job type
+    print("\nCreating statement pairs...")
+    for job_type, job_statements in jd_by_job.items():
         output_file = os.path.join(output_path, f'statement_pairs_{job_type}.json')
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'job_type': job_type,
-                'total_pairs': len(pairs),
-                'pairs': pairs
-            }, f, indent=2)
-        print(f"Saved {len(pairs):,} pairs for {job_type} to {output_file}")
+        progress = tqdm(job_statements, desc=f"Creating pairs for {job_type}")
+        total_pairs = len(job_statements) * len(resume_payloads)
+        _write_pairs_stream(output_file, {
+            'job_type': job_type,
+            'total_pairs': total_pairs
+        }, map(orjson.dumps, _iter_pairs(progress, resume_payloads)))
+        print(f"Saved {total_pairs:,} pairs for {job_type} to {output_file}")
 
 def main():
     # Update these paths to match your directory structure
@@ -1,30 +1,42 @@
-import json
+import mmap
+import orjson
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterator, List, Tuple
 
-def create_job_description_files(input_file: str, output_dir: str, num_files: int = 1000):
-    """
-    Process job descriptions from a JSON file and create individual text files
-    
-    Args:
-        input_file (str): Path to input JSON file with job descriptions
-        output_dir (str): Directory to store output text files
-        num_files (int): Number of files to process (default 1000)
+def _chunk_boundaries(mm: mmap.mmap, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    """Split the mapped file into (start, end) byte ranges that end on a line boundary"""
+    size = len(mm)
+    start = 0
+    while start < size:
+        end = mm.find(b'\n', min(start + chunk_size, size))
+        end = size if end == -1 else end + 1
+        yield start, end
+        start = end
+
+def _parse_chunk(input_file: str, start: int, end: int, max_jobs: int) -> List[Tuple[str, str]]:
     """
+    Parse the job description lines in [start, end)
     
-    # Create output directory if it doesn't exist
-    Path(output_dir).mkdir(parents=True, exist_ok=True)
-    
-    count = 0
+    No files are created here; the parent decides which job descriptions are kept.
     
-    with open(input_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            if count >= num_files:
-                break
-                
+    Returns:
+        (job ID, text) of at most `max_jobs` job descriptions with text, in file order
+    """
+    parsed = []
+    with open(input_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = start
+        while pos < end and len(parsed) < max_jobs:
+            line_end = mm.find(b'\n', pos, end)
+            if line_end == -1:
+                line_end = end
+            line = mm[pos:line_end]
+            pos = line_end + 1
+            
             try:
                 # Parse JSON line
-                job_data = json.loads(line.strip())
+                job_data = orjson.loads(line)
                 
                 # Get job ID
                 job_id = job_data['_id']['$oid']
@@ -33,25 +45,64 @@ def create_job_description_files(input_file: str, output_dir: str, num_files: in
                 text_content = job_data.get('text', '')
                 
                 if text_content:
-                    # Create output file path
-                    output_file = os.path.join(output_dir, f"{job_id}.txt")
-                    
-                    # Write text content to file
-                    with open(output_file, 'w', encoding='utf-8') as out_f:
-                        out_f.write(text_content)
-                    
-                    count += 1
-                    
-                    if count % 100 == 0:
-                        print(f"Processed {count} files...")
-                        
-            except json.JSONDecodeError:
+                    parsed.append((job_id, text_content))
+            
+            except orjson.JSONDecodeError:
                 print(f"Error parsing JSON line")
                 continue
             except Exception as e:
                 print(f"Error processing job description: {e}")
                 continue
     
+    return parsed
+
+def create_job_description_files(input_file: str, output_dir: str, num_files: int = 1000,
+                                 chunk_size: int = 16 * 1024 * 1024):
+    """
+    Process job descriptions from a JSON file and create individual text files
+    
+    The input is memory-mapped and split into line-aligned chunks that are parsed
+    in parallel. Chunks are consumed in file order and only the first `num_files`
+    job descriptions are written, matching a sequential scan.
+    
+    Args:
+        input_file (str): Path to input JSON file with job descriptions
+        output_dir (str): Directory to store output text files
+        num_files (int): Number of files to process (default 1000)
+        chunk_size (int): Approximate size in bytes of each chunk handed to a worker
+    """
+    
+    # Create output directory if it doesn't exist
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    
+    count = 0
+    if os.path.getsize(input_file) == 0:
+        print(f"Successfully created {count} job description files")
+        return
+    
+    with open(input_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        boundaries = list(_chunk_boundaries(mm, chunk_size))
+    
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = [
+            executor.submit(_parse_chunk, input_file, start, end, num_files)
+            for start, end in boundaries
+        ]
+        
+        for future in futures:
+            # Only the job descriptions within the limit are written
+            for job_id, text_content in future.result()[:num_files - count]:
+                output_file = os.path.join(output_dir, f"{job_id}.txt")
+                with open(output_file, 'w', encoding='utf-8') as out_f:
+                    out_f.write(text_content)
+                count += 1
+            
+            if count >= num_files:
+                for pending in futures:
+                    pending.cancel()
+                break
+            print(f"Processed {count} files...")
+    
     print(f"Successfully created {count} job description files")
 
 if __name__ == "__main__":
@@ -1,7 +1,12 @@
 import os
 import time
 import random
+import shutil
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from selenium import webdriver
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
@@ -79,6 +84,15 @@ query_template = '(intitle:resume OR inurl:resume) -job -jobs -sample -samples -
 # Directory to save resumes
 base_dir = "resumes"
 
+# Persistent HTTP session for PDF downloads: keeps TCP/TLS connections warm
+# across downloads from the same host and bounds retries on transient errors
+session = requests.Session()
+session.headers.update({"Connection": "keep-alive"})
+retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=retries)
+session.mount("http://", adapter)
+session.mount("https://", adapter)
+
 # Function to create directory if it doesn't exist
 def create_dir_if_not_exists(directory):
     if not os.path.exists(directory):
@@ -86,18 +100,27 @@ def create_dir_if_not_exists(directory):
 
 # Function to download PDFs
 def download_pdf(link, folder, role_name, i):
+    pdf_path = f'{folder}/{role_name}_resume_{i+1}.pdf'
+    part_path = f'{pdf_path}.part'
     try:
         # Send a GET request
-        response = requests.get(link, timeout=10)
-        if response.status_code == 200:
-            with open(f'{folder}/{role_name}_resume_{i+1}.pdf', 'wb') as file:
-                file.write(response.content)
-            print(f'Successfully downloaded: {folder}/{role_name}_resume_{i+1}.pdf from {link}')
-            return True
-        else:
-            print(f'Failed to download {link}: HTTP Status {response.status_code}')
+        with session.get(link, timeout=10, stream=True) as response:
+            if response.status_code == 200:
+                # Stream the body to a temporary file instead of buffering the whole PDF;
+                # only a complete download is renamed to the final path
+                response.raw.decode_content = True
+                with open(part_path, 'wb') as file:
+                    shutil.copyfileobj(response.raw, file)
+                os.replace(part_path, pdf_path)
+                print(f'Successfully downloaded: {pdf_path} from {link}')
+                return True
+            else:
+                print(f'Failed to download {link}: HTTP Status {response.status_code}')
     except Exception as e:
         print(f"Failed to download {link}: {e}")
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return False
 
 # Function to get resumes for a role
 def get_resumes_for_role(field, role):
@@ -168,17 +191,10 @@ def get_resumes_for_role(field, role):
     if len(pdf_links) < 30:
         print(f"Warning: Only {len(pdf_links)} resumes found for {role}. Proceeding with what is available.")
 
-    # Download PDFs with retry for failed downloads
-    successful_downloads = 0
-    failed_links = []
-    
-    while successful_downloads < len(pdf_links):
-        # Attempt to download PDFs
-        for i, link in enumerate(pdf_links):
-            if download_pdf(link, folder_path, role_name, successful_downloads):
-                successful_downloads += 1
-            else:
-                failed_links.append(link)
+    # Download PDFs concurrently; retries are bounded by the session's Retry policy
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = executor.map(download_pdf, pdf_links, repeat(folder_path), repeat(role_name), range(len(pdf_links)))
+        successful_downloads = sum(1 for downloaded in results if downloaded)
 
     print(f"Completed downloads: {successful_downloads} resumes for {role}.")
     
@@ -1,25 +1,43 @@
 import os
-import hashlib
+import xxhash
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from resume_name_handler import rename_resumes
 
-def get_file_hash(filepath):
-    hasher = hashlib.sha256()
+def get_file_hash(filepath, chunk_size=1 << 20):
+    # Duplicate detection doesn't need a cryptographic hash; xxh3 is much faster.
+    # Read in chunks so large PDFs are never fully loaded into memory.
+    hasher = xxhash.xxh3_64()
     with open(filepath, 'rb') as file:
-        buf = file.read()
-        hasher.update(buf)
-    return hasher.hexdigest()
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.intdigest()
 
-def remove_duplicate_resumes(base_dir):
+def remove_duplicate_resumes(base_dir, max_workers=16):
     hash_dict = defaultdict(list)
     duplicates_removed = 0
 
+    # Files can only be duplicates if their sizes match, so group by size first
+    # and only read the contents of files that share a size with another file
+    size_dict = defaultdict(list)
     for root, dirs, files in os.walk(base_dir):
         for filename in files:
             if filename.endswith('.pdf'):
                 filepath = os.path.join(root, filename)
-                file_hash = get_file_hash(filepath)
-                hash_dict[file_hash].append(filepath)
+                size_dict[os.path.getsize(filepath)].append(filepath)
+
+    candidates = [
+        filepath
+        for file_list in size_dict.values()
+        if len(file_list) > 1
+        for filepath in file_list
+    ]
+
+    # Hashing is I/O bound and xxhash releases the GIL, so threads overlap well.
+    # map() keeps walk order, so the file kept for each hash is unchanged.
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for filepath, file_hash in zip(candidates, executor.map(get_file_hash, candidates)):
+            hash_dict[file_hash].append(filepath)
 
     for file_hash, file_list in hash_dict.items():
         if len(file_list) > 1:
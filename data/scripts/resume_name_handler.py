@@ -1,6 +1,8 @@
 import os
 import re
 
+_RESUME_RE = re.compile(r'(?P<role>.+)_resume_(?P<num>\d+)\.pdf$')
+
 def rename_resumes(base_dir):
     for root, dirs, files in os.walk(base_dir):
         role_files = {}
@@ -8,17 +10,17 @@ def rename_resumes(base_dir):
         # Group files by role
         for filename in files:
             if filename.endswith('.pdf'):
-                match = re.match(r'(.+)_resume_\d+\.pdf', filename)
+                match = _RESUME_RE.match(filename)
                 if match:
-                    role = match.group(1)
+                    role = match['role']
                     if role not in role_files:
                         role_files[role] = []
-                    role_files[role].append(filename)
+                    role_files[role].append((int(match['num']), filename))
         
         # Rename files for each role
         for role, filenames in role_files.items():
-            filenames.sort(key=lambda x: int(re.search(r'_resume_(\d+)\.pdf', x).group(1)))
-            for i, old_name in enumerate(filenames, start=1):
+            filenames.sort()
+            for i, (_, old_name) in enumerate(filenames, start=1):
                 new_name = f"{role}_resume_{i}.pdf"
                 old_path = os.path.join(root, old_name)
                 new_path = os.path.join(root, new_name)
@@ -0,0 +1,68 @@
+import os
+import sys
+import orjson
+from typing import Any, Dict, Iterable, Tuple
+from dataclasses import dataclass
+
+def _intern_fields(obj, fields: Tuple[str, ...]):
+    """Intern short categorical string fields so repeated values share one str object"""
+    for name in fields:
+        value = getattr(obj, name)
+        if isinstance(value, str):
+            object.__setattr__(obj, name, sys.intern(value))
+
+@dataclass(slots=True, frozen=True)
+class JDStatement:
+    statement: str
+    jd_id: str
+    job_type: str
+    category: str
+
+    def __post_init__(self):
+        _intern_fields(self, ('jd_id', 'job_type', 'category'))
+
+    def __reduce__(self):
+        # Rebuild through __init__ so strings are re-interned in the receiving process
+        return (JDStatement, (self.statement, self.jd_id, self.job_type, self.category))
+
+@dataclass(slots=True, frozen=True)
+class SkillStatement:
+    statement: str
+    resume_id: str
+    resume_type: str
+    skill_name: str
+    skill_level: str
+    skill_years: Any
+    evidence_count: int
+
+    def __post_init__(self):
+        _intern_fields(self, ('resume_id', 'resume_type', 'skill_level'))
+
+    def __reduce__(self):
+        # Rebuild through __init__ so strings are re-interned in the receiving process
+        return (SkillStatement, (self.statement, self.resume_id, self.resume_type, self.skill_name,
+                                 self.skill_level, self.skill_years, self.evidence_count))
+
+def _write_pairs_stream(output_file: str, header: Dict, chunks: Iterable[bytes]):
+    """
+    Write a pairs file incrementally as `{**header, "pairs": [...]}`
+
+    Each chunk holds one or more encoded pairs (comma-joined) and is written as
+    soon as it is produced, so peak memory stays constant regardless of the
+    number of pairs. The pairs file is compact; the header alone is also saved
+    pretty-printed to a `_summary.json` file next to it for quick inspection.
+    """
+    with open(output_file, 'wb') as f:
+        # Reopen the serialized header object so the pairs array can be appended to it
+        f.write(orjson.dumps(header)[:-1] + b',"pairs":[\n')
+        first = True
+        for chunk in chunks:
+            if not first:
+                f.write(b',\n')
+            f.write(chunk)
+            first = False
+        f.write(b'\n]}')
+
+    summary_file = os.path.splitext(output_file)[0] + '_summary.json'
+    with open(summary_file, 'wb') as f:
+        f.write(orjson.dumps(header, option=orjson.OPT_INDENT_2))
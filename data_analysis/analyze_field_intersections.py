@@ -1,13 +1,17 @@
-import json
 import os
 from collections import defaultdict
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Tuple
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 import logging
 from pathlib import Path
 import numpy as np
+import ijson
+import orjson
+from scipy.sparse import csr_matrix
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,53 +26,155 @@ logger = logging.getLogger(__name__)
 class FieldIntersectionAnalyzer:
     def __init__(self, model_name: str):
         self.model_name = model_name
-        self.raw_matches = defaultdict(list)
-        self.raw_negative_matches = defaultdict(list)
-        self.field_jobs: Dict[str, Set[str]] = defaultdict(set)
-        self.field_negative_jobs: Dict[str, Set[str]] = defaultdict(set)
+        # Job IDs are encoded as dense ints; each field's jobs are a sorted, unique int32 array
+        self._job_id_to_int: Dict[str, int] = {}
+        self._job_ids: List[str] = []
+        # Per field (job codes, similarity scores), ranked best-first / worst-first
+        self.raw_matches: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.raw_negative_matches: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.field_jobs: Dict[str, np.ndarray] = {}
+        self.field_negative_jobs: Dict[str, np.ndarray] = {}
         self.intersection_counts: Dict[Tuple[str, str], int] = defaultdict(int)
         self.negative_intersection_counts: Dict[Tuple[str, str], int] = defaultdict(int)
-        self.job_similarity_scores: Dict[str, Dict[str, float]] = defaultdict(dict)
+        # Job codes and scores of each field's current top/bottom N matches, in ranked order
+        self._top_n: int = None
+        self._top_codes: Dict[str, np.ndarray] = {}
+        self._top_scores: Dict[str, np.ndarray] = {}
+        self._negative_top_codes: Dict[str, np.ndarray] = {}
+        self._negative_top_scores: Dict[str, np.ndarray] = {}
+        self._job_similarity_scores: Dict[str, Dict[str, float]] = None  # Built lazily from the top N
+        # Number of positive fields each job is in, and how many jobs are in at least one
+        self._job_refcount = np.zeros(0, dtype=np.int64)
+        self.total_unique_jobs = 0
+        # (fields, max N, positive, negative) rank matrices shared by every N <= max N
+        self._ranked_incidence: Tuple[List[str], int, csr_matrix, csr_matrix] = None
         
-    def load_analysis_results(self, results_file: str):
-        """Load the analysis results from the JSON file"""
+    def load_analysis_results(self, results_file: str, max_n: int = None):
+        """
+        Load the analysis results from the JSON file
+        
+        The file is streamed one field at a time. When `max_n` (the largest N
+        that will be queried) is given, only each field's top and bottom `max_n`
+        matches are kept, bounding memory to O(fields x max_n).
+        """
         logger.info(f"Loading analysis results from {results_file}")
-        with open(results_file, 'r') as f:
-            data = json.load(f)
-            
+        
         # Store raw matches and negative matches
-        for field, field_data in data.items():
-            self.raw_matches[field] = sorted(
-                field_data['top_matches'],
-                key=lambda x: x['similarity_score'],
-                reverse=True
-            )
-            self.raw_negative_matches[field] = sorted(
-                field_data['least_matches'],
-                key=lambda x: x['similarity_score']
-            )
+        with open(results_file, 'rb') as f:
+            for field, field_data in ijson.kvitems(f, '', use_float=True):
+                self.raw_matches[field] = self._ranked_arrays(field_data['top_matches'], True, max_n)
+                self.raw_negative_matches[field] = self._ranked_arrays(field_data['least_matches'], False, max_n)
         
         logger.info(f"Loaded raw data for {len(self.raw_matches)} fields")
     
+    def _ranked_arrays(self, matches: List[dict], descending: bool,
+                       max_n: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Convert match dicts into aligned (job codes, scores) arrays ordered by score
+        
+        When `max_n` is given only the best `max_n` matches are kept; they are
+        selected with a partition so only those are fully sorted. Equal scores
+        keep their file order, as with a full stable sort, including ties at
+        the `max_n` cutoff.
+        """
+        # float64, as parsed: float32 would merge nearby scores into ties and reorder the ranking
+        scores = np.fromiter((m['similarity_score'] for m in matches), dtype=np.float64, count=len(matches))
+        keys = -scores if descending else scores
+        if max_n is not None and len(keys) > max_n:
+            # Everything strictly better than the cutoff score, then the earliest matches tied with it
+            cutoff = np.partition(keys, max_n - 1)[max_n - 1]
+            better = np.flatnonzero(keys < cutoff)
+            tied = np.flatnonzero(keys == cutoff)[:max_n - len(better)]
+            # Indices are merged in file order so the stable sort breaks ties by position
+            order = np.sort(np.concatenate([better, tied]))
+            order = order[np.argsort(keys[order], kind='stable')]
+        else:
+            order = np.argsort(keys, kind='stable')
+        
+        # Only the retained matches get job codes assigned
+        job_codes = np.fromiter((self._job_int(matches[i]['job_id']) for i in order.tolist()),
+                                dtype=np.int32, count=len(order))
+        return job_codes, scores[order]
+    
+    def _job_int(self, job_id: str) -> int:
+        """Return the dense integer code for a job ID, assigning one on first sight"""
+        code = self._job_id_to_int.get(job_id)
+        if code is None:
+            code = self._job_id_to_int[job_id] = len(self._job_ids)
+            self._job_ids.append(job_id)
+        return code
+    
     def filter_top_n_matches(self, n: int):
-        """Filter to only include top N matches and bottom N matches for each field"""
-        self.field_jobs.clear()
-        self.field_negative_jobs.clear()
-        self.job_similarity_scores.clear()
-        
-        for field, matches in self.raw_matches.items():
-            for match in matches[:n]:
-                job_id = match['job_id']
-                similarity = match['similarity_score']
-                self.field_jobs[field].add(job_id)
-                self.job_similarity_scores[job_id][field] = similarity
-        
-        for field, matches in self.raw_negative_matches.items():
-            for match in matches[:n]:
-                job_id = match['job_id']
-                similarity = match['similarity_score']
-                self.field_negative_jobs[field].add(job_id)
-                self.job_similarity_scores[job_id][field] = similarity
+        """
+        Filter to only include top N matches and bottom N matches for each field
+        
+        Thresholds are normally swept downward, so when N shrinks only the
+        matches that fall out of the window are processed instead of rebuilding.
+        """
+        if self._top_n is not None and n <= self._top_n:
+            self._shrink_top_n(n)
+        else:
+            self._rebuild_top_n(n)
+        self._top_n = n
+        self._job_similarity_scores = None
+    
+    def _rebuild_top_n(self, n: int):
+        """Build the top/bottom N state for every field from scratch"""
+        for state in (self.field_jobs, self.field_negative_jobs, self._top_codes, self._top_scores,
+                      self._negative_top_codes, self._negative_top_scores):
+            state.clear()
+        
+        for raw_matches, top_codes, top_scores, field_jobs in (
+                (self.raw_matches, self._top_codes, self._top_scores, self.field_jobs),
+                (self.raw_negative_matches, self._negative_top_codes, self._negative_top_scores, self.field_negative_jobs)):
+            for field, (job_codes, scores) in raw_matches.items():
+                # Views into the ranked arrays; no per-match work
+                job_codes, scores = job_codes[:n], scores[:n]
+                if len(job_codes):
+                    top_codes[field] = job_codes
+                    top_scores[field] = scores
+                    field_jobs[field] = np.unique(job_codes)
+        
+        all_jobs = np.concatenate(list(self.field_jobs.values())) if self.field_jobs else np.empty(0, dtype=np.int32)
+        self._job_refcount = np.bincount(all_jobs, minlength=len(self._job_ids))
+        self.total_unique_jobs = int(np.count_nonzero(self._job_refcount))
+    
+    def _shrink_top_n(self, n: int):
+        """Shrink the current top/bottom N state to a smaller N by dropping the tail matches"""
+        for top_codes, top_scores, field_jobs in ((self._top_codes, self._top_scores, self.field_jobs),
+                                                  (self._negative_top_codes, self._negative_top_scores, self.field_negative_jobs)):
+            for field, codes in list(top_codes.items()):
+                kept = np.unique(codes[:n])
+                if field_jobs is self.field_jobs:
+                    # Update the unique-job count from the jobs this field no longer has
+                    removed = np.setdiff1d(field_jobs[field], kept, assume_unique=True)
+                    self._job_refcount[removed] -= 1
+                    self.total_unique_jobs -= int(np.count_nonzero(self._job_refcount[removed] == 0))
+                if len(kept):
+                    top_codes[field] = codes[:n]
+                    top_scores[field] = top_scores[field][:n]
+                    field_jobs[field] = kept
+                else:
+                    del top_codes[field], top_scores[field], field_jobs[field]
+    
+    @property
+    def job_similarity_scores(self) -> Dict[str, Dict[str, float]]:
+        """
+        Similarity of each job to every field whose current top N contains it
+        
+        Only positive matches are included, keeping each field's best score for a
+        job as find_cross_domain_jobs does. Built once per filter_top_n_matches
+        call from the ranked (job codes, scores) windows and cached until the
+        next call.
+        """
+        if self._job_similarity_scores is None:
+            job_scores = defaultdict(dict)
+            for field, codes in self._top_codes.items():
+                for job, score in zip(codes.tolist(), self._top_scores[field].tolist()):
+                    # Ranked best-first, so the first score seen for a job is its best
+                    job_scores[self._job_ids[job]].setdefault(field, score)
+            self._job_similarity_scores = job_scores
+        return self._job_similarity_scores
     
     def analyze_intersections_for_n(self, n: int):
         """Analyze intersections for top N matches"""
@@ -87,7 +193,7 @@ class FieldIntersectionAnalyzer:
                 'intersection_matrix': intersection_matrix,
                 'negative_intersection_matrix': negative_intersection_matrix,
                 'cross_domain_count': len(cross_domain_jobs),
-                'total_unique_jobs': len(set.union(*self.field_jobs.values()) if self.field_jobs else set())
+                'total_unique_jobs': self.total_unique_jobs
             }
         
         return results
@@ -114,33 +220,37 @@ class FieldIntersectionAnalyzer:
         
         # Create heatmaps for selected thresholds
         for n in thresholds:
-            # Positive matches heatmap
-            plt.figure(figsize=(12, 10))
-            sns.heatmap(
+            self._save_heatmap(
                 results[n]['intersection_matrix'],
-                annot=True,
-                fmt='d',
-                cmap='YlOrRd',
-                square=True
+                f'Field Intersections - Positive Matches (Top {n})',
+                os.path.join(output_dir, f'intersections_positive_top_{n}.png')
             )
-            plt.title(f'Field Intersections - Positive Matches (Top {n})')
-            plt.tight_layout()
-            plt.savefig(os.path.join(output_dir, f'intersections_positive_top_{n}.png'))
-            plt.close()
-            
-            # Negative matches heatmap
-            plt.figure(figsize=(12, 10))
-            sns.heatmap(
+            self._save_heatmap(
                 results[n]['negative_intersection_matrix'],
-                annot=True,
-                fmt='d',
-                cmap='YlOrRd',
-                square=True
+                f'Field Intersections - Negative Matches (Bottom {n})',
+                os.path.join(output_dir, f'intersections_negative_top_{n}.png')
             )
-            plt.title(f'Field Intersections - Negative Matches (Bottom {n})')
-            plt.tight_layout()
-            plt.savefig(os.path.join(output_dir, f'intersections_negative_top_{n}.png'))
-            plt.close()
+    
+    @staticmethod
+    def _save_heatmap(matrix: pd.DataFrame, title: str, output_file: str):
+        """Render one intersection heatmap and release its figure immediately"""
+        # Every cell is annotated; past 20 fields the labels shrink so they still fit their cells
+        font_size = min(10, max(4, 200 // max(len(matrix), 1)))
+        
+        fig, ax = plt.subplots(figsize=(12, 10))
+        sns.heatmap(
+            matrix,
+            annot=True,
+            fmt='d',
+            annot_kws={'fontsize': font_size},
+            cmap='YlOrRd',
+            square=True,
+            ax=ax
+        )
+        ax.set_title(title)
+        fig.tight_layout()
+        fig.savefig(output_file)
+        plt.close(fig)
     
     def generate_threshold_report(self, results: Dict[int, dict], output_dir: str):
         """Generate a report comparing different thresholds"""
@@ -172,45 +282,114 @@ class FieldIntersectionAnalyzer:
                 f.write(f"Average intersection size: {avg_intersection:.2f}\n")
                 f.write(f"Maximum intersection size: {max_intersection:.0f}\n\n")
     
+    def _ranked_matrix(self, raw_matches: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                       fields: List[str], max_n: int) -> csr_matrix:
+        """
+        Build a (fields x jobs) sparse matrix of best ranks within each field's top `max_n`
+        
+        Entry (i, j) is 1 + the first position at which job j appears in field
+        i's ranked matches, so the incidence matrix for any N <= max_n is just
+        `data <= N` over the same structure.
+        """
+        empty = np.empty(0, dtype=np.int32)
+        rows, ranks = [], []
+        for field in fields:
+            job_codes = raw_matches[field][0][:max_n] if field in raw_matches else empty
+            unique_codes, first_seen = np.unique(job_codes, return_index=True)
+            rows.append(unique_codes)
+            ranks.append(first_seen + 1)
+        indptr = np.zeros(len(fields) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=indptr[1:])
+        
+        return csr_matrix(
+            (np.concatenate(ranks).astype(np.int32) if ranks else empty,
+             np.concatenate(rows) if rows else empty,
+             indptr),
+            shape=(len(fields), len(self._job_ids))
+        )
+    
+    @staticmethod
+    def _intersection_matrix(ranked: csr_matrix, n: int) -> np.ndarray:
+        """
+        Compute all pairwise intersection sizes between the fields' top N job sets
+        
+        Masks the rank matrix down to a (fields x jobs) incidence matrix M and
+        returns M @ M.T, whose entry (i, j) is the number of jobs shared by
+        fields i and j.
+        """
+        # Keep only the entries within the top N so the product never visits the rest
+        keep = ranked.data <= n
+        kept_before = np.zeros(len(keep) + 1, dtype=np.int64)
+        np.cumsum(keep, out=kept_before[1:])
+        incidence = csr_matrix(
+            (np.ones(int(kept_before[-1]), dtype=np.int32), ranked.indices[keep], kept_before[ranked.indptr]),
+            shape=ranked.shape
+        )
+        
+        # Write the product straight into a preallocated int32 array that the
+        # DataFrames then wrap, rather than storing cells through pandas indexers
+        matrix = np.zeros(ranked.shape[:1] * 2, dtype=np.int32)
+        field_sizes = np.diff(incidence.indptr)
+        if np.count_nonzero(field_sizes) > 1:
+            (incidence @ incidence.T).astype(np.int32).toarray(out=matrix)
+        else:
+            # At most one non-empty field: only its self-intersection can be non-zero
+            np.fill_diagonal(matrix, field_sizes)
+        return matrix
+    
     def analyze_intersections(self):
         """Analyze intersections between different fields for both positive and negative matches"""
         fields = list(self.field_jobs.keys())
-        intersection_matrix = pd.DataFrame(0, index=fields, columns=fields)
-        negative_intersection_matrix = pd.DataFrame(0, index=fields, columns=fields)
-        
-        # Calculate intersections for positive matches
-        for i, field1 in enumerate(fields):
-            for field2 in fields[i:]:
-                intersection = self.field_jobs[field1] & self.field_jobs[field2]
-                self.intersection_counts[(field1, field2)] = len(intersection)
-                intersection_matrix.loc[field1, field2] = len(intersection)
-                intersection_matrix.loc[field2, field1] = len(intersection)
-        
-        # Calculate intersections for negative matches
-        for i, field1 in enumerate(fields):
-            for field2 in fields[i:]:
-                intersection = self.field_negative_jobs[field1] & self.field_negative_jobs[field2]
-                self.negative_intersection_counts[(field1, field2)] = len(intersection)
-                negative_intersection_matrix.loc[field1, field2] = len(intersection)
-                negative_intersection_matrix.loc[field2, field1] = len(intersection)
+        
+        # The rank matrices are built once for the largest N of a downward sweep and reused
+        cached = self._ranked_incidence
+        if cached is None or cached[0] != fields or cached[1] < self._top_n:
+            cached = self._ranked_incidence = (
+                fields,
+                self._top_n,
+                self._ranked_matrix(self.raw_matches, fields, self._top_n),
+                self._ranked_matrix(self.raw_negative_matches, fields, self._top_n)
+            )
+        positive = self._intersection_matrix(cached[2], self._top_n)
+        negative = self._intersection_matrix(cached[3], self._top_n)
+        
+        # Record pair counts from the upper triangle (including the diagonal)
+        for i, j in zip(*np.triu_indices(len(fields))):
+            self.intersection_counts[(fields[i], fields[j])] = int(positive[i, j])
+            self.negative_intersection_counts[(fields[i], fields[j])] = int(negative[i, j])
+        
+        intersection_matrix = pd.DataFrame(positive, index=fields, columns=fields, copy=False)
+        negative_intersection_matrix = pd.DataFrame(negative, index=fields, columns=fields, copy=False)
         
         return intersection_matrix, negative_intersection_matrix
     
-    def find_cross_domain_jobs(self, min_fields: int = 2) -> Dict[str, List[str]]:
+    def find_cross_domain_jobs(self, min_fields: int = 2) -> Dict[str, List[Tuple[str, float]]]:
         """Find jobs that appear in multiple fields"""
-        job_fields: Dict[str, List[Tuple[str, float]]] = defaultdict(list)
+        if not self._top_codes:
+            return {}
         
-        # Collect all fields for each job
-        for field, jobs in self.field_jobs.items():
-            for job_id in jobs:
-                similarity = self.job_similarity_scores[job_id][field]
-                job_fields[job_id].append((field, similarity))
+        # Long-form (job, field, similarity) table of every field's current top N
+        matches = pd.concat([
+            pd.DataFrame({'job': codes, 'field': field, 'similarity': self._top_scores[field]})
+            for field, codes in self._top_codes.items()
+        ], ignore_index=True).drop_duplicates(['job', 'field'])
+        
+        # Keep jobs that appear in enough fields, ordered by job then descending similarity
+        field_counts = matches.groupby('job')['field'].transform('size')
+        matches = matches[field_counts >= min_fields].sort_values(
+            ['job', 'similarity'], ascending=[True, False]
+        )
+        
+        # Split the sorted table into one run per job
+        jobs = matches['job'].to_numpy()
+        fields = matches['field'].tolist()
+        similarities = matches['similarity'].tolist()
+        starts = np.flatnonzero(np.r_[True, jobs[1:] != jobs[:-1]]) if len(jobs) else []
+        ends = list(starts[1:]) + [len(jobs)]
         
-        # Filter for jobs that appear in multiple fields
         cross_domain_jobs = {
-            job_id: sorted(fields, key=lambda x: x[1], reverse=True)
-            for job_id, fields in job_fields.items()
-            if len(fields) >= min_fields
+            self._job_ids[jobs[start]]: list(zip(fields[start:end], similarities[start:end]))
+            for start, end in zip(starts, ends)
         }
         
         return cross_domain_jobs
@@ -219,37 +398,44 @@ class FieldIntersectionAnalyzer:
         """Analyze statistical properties of the embeddings"""
         stats = {}
         
-        # Analyze field embeddings
-        field_dims = {field: emb.shape for field, emb in self.field_embeddings.items()}
-        field_norms = {field: np.linalg.norm(emb) for field, emb in self.field_embeddings.items()}
-        
-        # Analyze job embeddings
-        job_dims = {job_id: emb.shape for job_id, emb in self.job_embeddings.items()}
-        job_norms = {job_id: np.linalg.norm(emb) for job_id, emb in self.job_embeddings.items()}
+        # Analyze field and job embeddings
+        field_dims, field_norms = self._embedding_norms(self.field_embeddings)
+        job_dims, job_norms = self._embedding_norms(self.job_embeddings)
         
         # Calculate basic statistics
         stats['embedding_dimensions'] = {
-            'fields': list(set(d[0] for d in field_dims.values())),
-            'jobs': list(set(d[0] for d in job_dims.values()))
+            'fields': field_dims,
+            'jobs': job_dims
         }
         
         stats['norm_statistics'] = {
             'fields': {
-                'mean': np.mean(list(field_norms.values())),
-                'std': np.std(list(field_norms.values())),
-                'min': np.min(list(field_norms.values())),
-                'max': np.max(list(field_norms.values()))
+                'mean': np.mean(field_norms),
+                'std': np.std(field_norms),
+                'min': np.min(field_norms),
+                'max': np.max(field_norms)
             },
             'jobs': {
-                'mean': np.mean(list(job_norms.values())),
-                'std': np.std(list(job_norms.values())),
-                'min': np.min(list(job_norms.values())),
-                'max': np.max(list(job_norms.values()))
+                'mean': np.mean(job_norms),
+                'std': np.std(job_norms),
+                'min': np.min(job_norms),
+                'max': np.max(job_norms)
             }
         }
         
         return stats
     
+    @staticmethod
+    def _embedding_norms(embeddings: Dict[str, np.ndarray]) -> Tuple[List[int], np.ndarray]:
+        """Return the distinct embedding dimensions and the L2 norm of every embedding"""
+        dims = list(set(emb.shape[0] for emb in embeddings.values()))
+        if len(dims) == 1:
+            # Same-sized embeddings are stacked so all norms come from one vectorized call
+            norms = np.linalg.norm(np.stack(list(embeddings.values())), axis=1)
+        else:
+            norms = np.array([np.linalg.norm(emb) for emb in embeddings.values()])
+        return dims, norms
+    
     def generate_embedding_report(self, output_dir: str):
         """Generate a report on embedding statistics"""
         stats = self.analyze_embedding_statistics()
@@ -292,8 +478,9 @@ class FieldIntersectionAnalyzer:
             for k, v in results.items()
         }
         
-        with open(results_file, 'w') as f:
-            json.dump(serializable_results, f, indent=2)
+        with open(results_file, 'wb') as f:
+            f.write(orjson.dumps(serializable_results,
+                                 option=orjson.OPT_INDENT_2))
 
 def compare_model_results(output_dir: str, models: List[str]):
     """Compare results across different embedding models"""
@@ -303,19 +490,18 @@ def compare_model_results(output_dir: str, models: List[str]):
         model_dir = os.path.join(output_dir, model)
         results_file = os.path.join(model_dir, 'intersection_analysis_results.json')
         
-        with open(results_file, 'r') as f:
-            results = json.load(f)
+        with open(results_file, 'rb') as f:
+            results = orjson.loads(f.read())
             comparison_data[model] = results
     
     # Create comparison visualizations
     plt.figure(figsize=(15, 8))
     for model in models:
         thresholds = sorted([int(k) for k in comparison_data[model].keys()])
-        cross_domain_percentages = [
-            float(comparison_data[model][str(t)]['cross_domain_count']) / 
-            float(comparison_data[model][str(t)]['total_unique_jobs']) * 100
-            for t in thresholds
-        ]
+        entries = [comparison_data[model][str(t)] for t in thresholds]
+        cross_domain_counts = np.fromiter((e['cross_domain_count'] for e in entries), dtype=np.float64, count=len(entries))
+        unique_job_counts = np.fromiter((e['total_unique_jobs'] for e in entries), dtype=np.float64, count=len(entries))
+        cross_domain_percentages = cross_domain_counts / unique_job_counts * 100
         plt.plot(thresholds, cross_domain_percentages, label=f'{model} Model')
     
     plt.xlabel('Top N Matches')
@@ -341,11 +527,12 @@ def main():
         
         # Initialize analyzer for this model
         analyzer = FieldIntersectionAnalyzer(model)
-        analyzer.load_analysis_results(results_file)
+        start_n = 10000
+        analyzer.load_analysis_results(results_file, max_n=start_n)
         
         # Analyze multiple thresholds
         threshold_results = analyzer.analyze_multiple_thresholds(
-            start_n=10000,
+            start_n=start_n,
             step=1000,
             min_n=100
         )
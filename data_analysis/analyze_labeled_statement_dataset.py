@@ -37,7 +37,7 @@ def main():
     for k, v in stats['score_stats'].items():
         if isinstance(v, np.ndarray):
             # Handle numpy arrays (like quartiles)
-            formatted_value = ", ".join([f"{x:.3f}" for x in v])
+            formatted_value = ", ".join(np.char.mod('%.3f', v).tolist())
         else:
             # Handle single values
             formatted_value = f"{v:.3f}" if isinstance(v, (float, np.float32, np.float64)) else str(v)
@@ -47,8 +47,10 @@ def main():
     
     # Category distribution
     logger.info("\nCategory Distribution:")
-    cat_table = [[cat, count, f"{count/stats['total_pairs']*100:.1f}%"] 
-                 for cat, count in stats['category_dist'].items()]
+    categories = list(stats['category_dist'].keys())
+    counts = np.fromiter(stats['category_dist'].values(), dtype=np.int64, count=len(categories))
+    percentages = np.char.mod('%.1f%%', counts / stats['total_pairs'] * 100).tolist()
+    cat_table = list(zip(categories, counts.tolist(), percentages))
     logger.info(tabulate(cat_table, headers=['Category', 'Count', 'Percentage'], tablefmt='simple'))
     
     # Text length statistics
@@ -1,7 +1,9 @@
 import os
 import json
+import orjson
 import random
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple
 from tqdm import tqdm
 
@@ -13,14 +15,14 @@ def load_job_statements(jd_path: str) -> Tuple[List[str], Dict[str, int]]:
         Tuple of (all statements, count by category)
     """
     # Fields to analyze from job descriptions
-    jd_fields = [
+    jd_fields = frozenset([
         'must_have_requirements',
         'nice_to_have_requirements',
         'responsibilities',
         'required_skills',
         'experience_required',
         'educational_requirements'
-    ]
+    ])
     
     # Specific JD files to analyze
     target_files = [
@@ -32,27 +34,59 @@ def load_job_statements(jd_path: str) -> Tuple[List[str], Dict[str, int]]:
     all_statements = []
     category_counts = defaultdict(int)
     
-    print(f"\nProcessing {len(target_files)} job descriptions...")
-    for filename in tqdm(target_files, desc="Loading JD statements"):
+    def load_one(filename: str):
         filepath = os.path.join(jd_path, filename)
-        if not os.path.exists(filepath):
+        try:
+            with open(filepath, 'rb') as f:
+                return filename, orjson.loads(f.read())
+        except FileNotFoundError:
             print(f"Warning: File not found: {filename}")
-            continue
-            
-        with open(filepath, 'r', encoding='utf-8') as f:
-            try:
-                data = json.load(f)
-                for field in jd_fields:
-                    if field in data:
-                        statements = data[field]
-                        all_statements.extend(statements)
-                        category_counts[field] += len(statements)
-            except json.JSONDecodeError:
-                print(f"Error reading file: {filename}")
+        except orjson.JSONDecodeError:
+            print(f"Error reading file: {filename}")
+        return filename, None
+    
+    print(f"\nProcessing {len(target_files)} job descriptions...")
+    with ThreadPoolExecutor(max_workers=len(target_files)) as executor:
+        results = executor.map(load_one, target_files)
+        for filename, data in tqdm(results, total=len(target_files), desc="Loading JD statements"):
+            if data is None:
                 continue
+            # Single pass over the file's keys instead of probing it per field
+            for field, statements in data.items():
+                if field in jd_fields:
+                    all_statements.extend(statements)
+                    category_counts[field] += len(statements)
     
     return all_statements, dict(category_counts)
 
+def _load_resume_file(filepath: str) -> Tuple[List[str], Counter]:
+    """Load the skill descriptions and count statistics of a single resume"""
+    skill_descriptions = []
+    stats = Counter()
+    try:
+        with open(filepath, 'rb') as f:
+            data = orjson.loads(f.read())
+        
+        # Process skills, counting per file rather than per skill
+        skills = data.get('skills', ())
+        skill_descriptions = [skill['description'] for skill in skills if 'description' in skill]
+        if skill_descriptions:
+            stats['skill_descriptions'] = len(skill_descriptions)
+        # Track evidence count separately
+        evidence_counts = [len(skill['evidence']) for skill in skills if 'evidence' in skill]
+        if evidence_counts:
+            stats['total_skill_evidences'] = sum(evidence_counts)
+                    
+        # Track other fields count for reference
+        for field in ['education', 'certifications', 'personality_traits']:
+            if field in data:
+                stats[field] = len(data[field])
+    
+    except orjson.JSONDecodeError:
+        print(f"Error reading file: {filepath}")
+    
+    return skill_descriptions, stats
+
 def load_resume_statements(resume_path: str) -> Tuple[List[str], Dict[str, int]]:
     """
     Load skill descriptions from resumes
@@ -61,7 +95,7 @@ def load_resume_statements(resume_path: str) -> Tuple[List[str], Dict[str, int]]
         Tuple of (skill descriptions, count statistics)
     """
     skill_descriptions = []
-    stats = defaultdict(int)
+    stats = Counter()
     
     # Get all JSON files recursively
     json_files = []
@@ -71,29 +105,12 @@ def load_resume_statements(resume_path: str) -> Tuple[List[str], Dict[str, int]]
                 json_files.append(os.path.join(root, file))
     
     print(f"\nProcessing {len(json_files)} resumes...")
-    for filepath in tqdm(json_files, desc="Loading resume statements"):
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-                # Process skills
-                if 'skills' in data:
-                    for skill in data['skills']:
-                        if 'description' in skill:
-                            skill_descriptions.append(skill['description'])
-                            stats['skill_descriptions'] += 1
-                        # Track evidence count separately
-                        if 'evidence' in skill:
-                            stats['total_skill_evidences'] += len(skill['evidence'])
-                            
-                # Track other fields count for reference
-                for field in ['education', 'certifications', 'personality_traits']:
-                    if field in data:
-                        stats[field] += len(data[field])
-        
-        except json.JSONDecodeError:
-            print(f"Error reading file: {filepath}")
-            continue
+    # File reads release the GIL, so a thread pool overlaps the I/O across files
+    with ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 4) as executor:
+        results = executor.map(_load_resume_file, json_files)
+        for descriptions, file_stats in tqdm(results, total=len(json_files), desc="Loading resume statements"):
+            skill_descriptions.extend(descriptions)
+            stats.update(file_stats)
     
     return skill_descriptions, dict(stats)
 
@@ -1,9 +1,12 @@
 import os
-import json
+import heapq
+import orjson
 import logging
 from pathlib import Path
 from typing import Dict, List, Tuple
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 import shutil
@@ -18,6 +21,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# In-kernel copy primitives available on this platform, tried in order
+_KERNEL_COPIES = []
+if hasattr(os, 'copy_file_range'):
+    _KERNEL_COPIES.append(lambda src, dst, count: os.copy_file_range(src, dst, count))
+if hasattr(os, 'sendfile'):
+    _KERNEL_COPIES.append(lambda src, dst, count: os.sendfile(dst, src, None, count))
+
+def _copy_file(source_file: str, target_file: str, buffer_size: int = 1024 * 1024) -> None:
+    """Copy a file and its permission bits, in-kernel where possible, else through a 1 MiB buffer"""
+    src = os.open(source_file, os.O_RDONLY)
+    try:
+        dst = os.open(target_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            for copy_chunk in _KERNEL_COPIES:
+                try:
+                    while copy_chunk(src, dst, buffer_size):
+                        pass
+                    break
+                except OSError:
+                    # Unsupported for these files; start over with the next strategy
+                    os.lseek(src, 0, os.SEEK_SET)
+                    os.lseek(dst, 0, os.SEEK_SET)
+                    os.ftruncate(dst, 0)
+            else:
+                with open(src, 'rb', closefd=False) as fsrc, open(dst, 'wb', closefd=False) as fdst:
+                    shutil.copyfileobj(fsrc, fdst, buffer_size)
+        finally:
+            os.close(dst)
+    finally:
+        os.close(src)
+    shutil.copymode(source_file, target_file)
+
 class MatcherDatasetCreator:
     def __init__(self, top_n: int = 1000):
         self.top_n = top_n
@@ -26,37 +61,31 @@ class MatcherDatasetCreator:
     def load_field_matches(self, results_file: str) -> None:
         """Load matching results from the analysis output"""
         try:
-            with open(results_file, 'r') as f:
-                data = json.load(f)
+            with open(results_file, 'rb') as f:
+                data = orjson.loads(f.read())
             
             for field, field_data in data.items():
                 # Get top positive matches
-                positive_matches = sorted(
+                positive_matches = heapq.nlargest(
+                    self.top_n,
                     field_data['top_matches'],
-                    key=lambda x: x['similarity_score'],
-                    reverse=True
-                )[:self.top_n]
+                    key=lambda x: x['similarity_score']
+                )
                 
                 # Get top negative matches
-                negative_matches = sorted(
+                negative_matches = heapq.nsmallest(
+                    self.top_n,
                     field_data['least_matches'],
                     key=lambda x: x['similarity_score']
-                )[:self.top_n]
+                )
                 
-                # Store matches with their type and score
+                # Store the parsed match records, tagged with their type
                 for match in positive_matches:
-                    self.matches_data[field].append({
-                        'job_id': match['job_id'],
-                        'similarity_score': match['similarity_score'],
-                        'match_type': 'positive'
-                    })
-                
+                    match['match_type'] = 'positive'
                 for match in negative_matches:
-                    self.matches_data[field].append({
-                        'job_id': match['job_id'],
-                        'similarity_score': match['similarity_score'],
-                        'match_type': 'negative'
-                    })
+                    match['match_type'] = 'negative'
+                self.matches_data[field].extend(positive_matches)
+                self.matches_data[field].extend(negative_matches)
                 
             logger.info(f"Loaded matches for {len(self.matches_data)} fields")
             
@@ -66,24 +95,28 @@ class MatcherDatasetCreator:
 
     def create_dataset(self) -> pd.DataFrame:
         """Create a unified dataset from the loaded matches"""
-        dataset_rows = []
+        # Columns are collected directly rather than as one dict per row
+        fields, job_ids, similarity_scores, match_types = [], [], [], []
         
         for field, matches in tqdm(self.matches_data.items(), desc="Creating dataset"):
+            fields.extend([field] * len(matches))
             for match in matches:
-                dataset_rows.append({
-                    'field': field,
-                    'job_id': match['job_id'],
-                    'similarity_score': match['similarity_score'],
-                    'match_type': match['match_type'],
-                    'is_match': 1 if match['match_type'] == 'positive' else 0
-                })
-        
-        df = pd.DataFrame(dataset_rows)
+                job_ids.append(match['job_id'])
+                similarity_scores.append(match['similarity_score'])
+                match_types.append(match['match_type'])
+        
+        df = pd.DataFrame({
+            'field': pd.Categorical(fields),
+            'job_id': job_ids,
+            'similarity_score': np.asarray(similarity_scores, dtype=np.float64),
+            'match_type': pd.Categorical(match_types)
+        })
+        df['is_match'] = (df['match_type'] == 'positive').astype(np.int8)
         
         # Add some basic statistics
         total_pairs = len(df)
-        positive_pairs = len(df[df['is_match'] == 1])
-        negative_pairs = len(df[df['is_match'] == 0])
+        positive_pairs = int(df['is_match'].sum())
+        negative_pairs = total_pairs - positive_pairs
         
         logger.info(f"Dataset created with {total_pairs} total pairs")
         logger.info(f"Positive pairs: {positive_pairs}")
@@ -100,15 +133,22 @@ class MatcherDatasetCreator:
         df.to_csv(output_path, index=False)
         
         # Convert groupby results to a more JSON-friendly format
-        field_match_counts = {}
-        for (field, match_type), count in df.groupby(['field', 'match_type']).size().items():
-            if field not in field_match_counts:
-                field_match_counts[field] = {}
-            field_match_counts[field][match_type] = int(count)
+        match_type_counts = df.groupby(['field', 'match_type'], observed=True).size().unstack()
+        field_match_counts = {
+            field: {match_type: int(count) for match_type, count in counts.items() if pd.notna(count)}
+            for field, counts in match_type_counts.to_dict(orient='index').items()
+        }
+        
+        # Pair counts and mean similarity per match label from a single groupby
+        by_match = df.groupby('is_match', sort=False, observed=True)
+        pair_counts = by_match.size()
+        mean_similarity = by_match['similarity_score'].mean()
         
         # Get unique job sets for positive and negative matches
-        positive_jobs = set(df[df['is_match'] == 1]['job_id'])
-        negative_jobs = set(df[df['is_match'] == 0]['job_id'])
+        is_positive = (df['is_match'] == 1).to_numpy()
+        job_ids = df['job_id'].to_numpy()
+        positive_jobs = set(job_ids[is_positive])
+        negative_jobs = set(job_ids[~is_positive])
         common_jobs = positive_jobs & negative_jobs
         
         # Create and save dataset statistics
@@ -123,17 +163,17 @@ class MatcherDatasetCreator:
                 'all_negative': len(negative_jobs)
             },
             'unique_fields': df['field'].nunique(),
-            'positive_pairs': len(df[df['is_match'] == 1]),
-            'negative_pairs': len(df[df['is_match'] == 0]),
-            'avg_similarity_positive': float(df[df['is_match'] == 1]['similarity_score'].mean()),
-            'avg_similarity_negative': float(df[df['is_match'] == 0]['similarity_score'].mean()),
+            'positive_pairs': int(pair_counts.get(1, 0)),
+            'negative_pairs': int(pair_counts.get(0, 0)),
+            'avg_similarity_positive': float(mean_similarity.get(1, float('nan'))),
+            'avg_similarity_negative': float(mean_similarity.get(0, float('nan'))),
             'fields_distribution': df['field'].value_counts().to_dict(),
             'match_type_by_field': field_match_counts
         }
         
         stats_path = os.path.join(output_dir, f"{model_name}_dataset_stats.json")
-        with open(stats_path, 'w') as f:
-            json.dump(stats, f, indent=2)
+        with open(stats_path, 'wb') as f:
+            f.write(orjson.dumps(stats, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         
         logger.info(f"Dataset saved to: {output_path}")
         logger.info(f"Statistics saved to: {stats_path}")
@@ -154,25 +194,24 @@ class MatcherDatasetCreator:
         # Get unique job IDs from the dataset
         unique_jobs = df['job_id'].unique()
         
-        copied_count = 0
-        missing_count = 0
-        
-        logger.info(f"Copying job description texts for {len(unique_jobs)} unique jobs")
-        for job_id in tqdm(unique_jobs, desc="Copying job texts"):
+        def copy_one(job_id: str) -> bool:
             source_file = os.path.join(source_dir, f"{job_id}.txt")
             target_file = os.path.join(target_dir, f"{job_id}.txt")
             
             try:
                 if os.path.exists(source_file):
-                    Path(target_file).parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy(source_file, target_file)
-                    copied_count += 1
-                else:
-                    logger.warning(f"Source file not found: {source_file}")
-                    missing_count += 1
+                    _copy_file(source_file, target_file)
+                    return True
+                logger.warning(f"Source file not found: {source_file}")
             except Exception as e:
                 logger.error(f"Error copying file {job_id}: {str(e)}")
-                missing_count += 1
+            return False
+        
+        logger.info(f"Copying job description texts for {len(unique_jobs)} unique jobs")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            copied = list(tqdm(executor.map(copy_one, unique_jobs), total=len(unique_jobs), desc="Copying job texts"))
+        copied_count = sum(copied)
+        missing_count = len(copied) - copied_count
         
         logger.info(f"Copied {copied_count} job description files")
         if missing_count > 0:
@@ -1,11 +1,17 @@
 import os
 import numpy as np
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from tqdm import tqdm
-from collections import defaultdict
-import faiss
 import logging
 from typing import Dict, List, Tuple
+from file_utils import current_packed_ids
+
+try:
+    import torch  # Only needed for the optional CUDA similarity path
+except ImportError:
+    torch = None
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,17 +23,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize `vectors` in place along the last axis and return it"""
+    # einsum computes the squared norms in one pass, without norm's temporaries and checks
+    norms = np.sqrt(np.einsum('...i,...i->...', vectors, vectors))
+    vectors /= norms[..., None]
+    return vectors
+
+def _load_normalized(embedding_path: str):
+    """Load one embedding file as float32 and L2-normalize it, returning the exception instead if that fails"""
+    try:
+        # Files may be stored as float16; normalizing in float32 keeps the norms accurate
+        return _normalize_rows(np.load(embedding_path).astype(np.float32).ravel())
+    except Exception as e:
+        return e
+
 class EmbeddingAnalyzer:
-    def __init__(self):
+    def __init__(self, job_dtype: type = np.float32, use_gpu: bool = False):
+        """
+        Args:
+            job_dtype: Storage dtype of the job matrix. np.float16 halves the bytes
+                scanned per similarity pass; products are still accumulated in float32.
+            use_gpu: Run the similarity matmul on CUDA with torch instead of the CPU BLAS path.
+        """
+        if use_gpu and torch is None:
+            raise ImportError("use_gpu=True requires torch to be installed")
+        self.job_dtype = job_dtype
+        self.device = 'cuda' if use_gpu else None
+        self._device_job_matrix = None  # job_matrix uploaded to self.device, transferred once per load
         self.field_embeddings = {}
         self.job_embeddings = {}
         self.job_ids = []  # To maintain mapping between index and job ID
-        self.resume_embeddings = defaultdict(dict)
-        self.index = None
+        self.job_names = []  # job_ids without the .npy suffix, as written to the results
+        self.job_matrix = None  # (jobs, dimension) normalized embeddings, rows aligned with job_ids
+        self.field_names = []
+        self.field_matrix = None  # (fields, dimension) normalized field embeddings, rows aligned with field_names
         self.dimension = None
     
-    def load_embeddings(self, resume_base_dir: str, job_dir: str):
-        """Load all embeddings and build FAISS index"""
+    def load_embeddings(self, resume_base_dir: str, job_dir: str, max_workers: int = 16):
+        """
+        Load all embeddings into normalized job and field matrices
+        
+        The many small .npy reads release the GIL, so they are overlapped on a
+        thread pool of `max_workers`; results are consumed in file order.
+        """
         logger.info("Loading embeddings...")
         
         # Validate directories
@@ -35,125 +74,212 @@ class EmbeddingAnalyzer:
             raise ValueError("Directory does not exist")
         
         # Load job embeddings first to determine dimension
-        job_files = [f for f in os.listdir(job_dir) if f.endswith('.npy')]
+        with os.scandir(job_dir) as entries:
+            job_entries = [entry for entry in entries if entry.name.endswith('.npy')]
+        job_files = [entry.name for entry in job_entries]
         if not job_files:
             raise ValueError(f"No embedding files found in job directory: {job_dir}")
         
-        # Load all job embeddings first to ensure consistent dimensions
-        job_embeddings_list = []
-        for file in tqdm(job_files, desc="Loading job embeddings"):
-            embedding_path = os.path.join(job_dir, file)
-            try:
-                embedding = np.load(embedding_path)
-                # Ensure 1D array and normalize
-                embedding = embedding.flatten()  # Convert to 1D if needed
-                embedding = embedding / np.linalg.norm(embedding)
-                job_embeddings_list.append(embedding)
-                self.job_ids.append(file)
-            except Exception as e:
-                logger.error(f"Error loading job embedding {file}: {str(e)}")
-                continue
-        
-        if not job_embeddings_list:
-            raise ValueError("No valid job embeddings loaded")
-        
-        # Stack all embeddings and initialize FAISS index
-        job_embeddings_array = np.vstack(job_embeddings_list)
-        self.dimension = job_embeddings_array.shape[1]
-        logger.info(f"Embedding dimension: {self.dimension}")
-        
-        # Initialize FAISS index with correct dimension
-        self.index = faiss.IndexFlatIP(self.dimension)
-        self.index.add(job_embeddings_array)
-        
-        # Load resume embeddings by field
-        fields = [d for d in os.listdir(resume_base_dir) 
-                 if os.path.isdir(os.path.join(resume_base_dir, d))]
-        
-        for field in fields:
-            field_path = os.path.join(resume_base_dir, field)
-            if os.path.isdir(field_path):
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Load all job embeddings first to ensure consistent dimensions
+            if not self._load_packed_jobs(job_dir, job_files):
+                job_embeddings_list = []
+                results = executor.map(_load_normalized, [entry.path for entry in job_entries])
+                for file, embedding in tqdm(zip(job_files, results), total=len(job_files), desc="Loading job embeddings"):
+                    if isinstance(embedding, Exception):
+                        logger.error(f"Error loading job embedding {file}: {str(embedding)}")
+                        continue
+                    # 1D array, normalized at load precision, then downcast
+                    job_embeddings_list.append(embedding.astype(self.job_dtype, copy=False))
+                    self.job_ids.append(file)
+                
+                if not job_embeddings_list:
+                    raise ValueError("No valid job embeddings loaded")
+                
+                # Stack all embeddings; a flat inner-product index would only be a matmul over this
+                self.job_matrix = np.vstack(job_embeddings_list)
+            
+            # Row-major job matrix, as the similarity GEMM expects
+            self.job_matrix = np.ascontiguousarray(self.job_matrix)
+            self._device_job_matrix = None
+            self.dimension = self.job_matrix.shape[1]
+            logger.info(f"Embedding dimension: {self.dimension}")
+            
+            # Load resume embeddings by field
+            # DirEntry caches the file type from the directory listing, so no extra stat per entry
+            with os.scandir(resume_base_dir) as entries:
+                field_dirs = [entry for entry in entries if entry.is_dir()]
+            
+            for field_dir in field_dirs:
+                field = field_dir.name
                 logger.info(f"Loading embeddings for field: {field}")
-                field_files = [f for f in os.listdir(field_path) if f.endswith('.npy')]
+                with os.scandir(field_dir.path) as entries:
+                    field_entries = [entry for entry in entries if entry.name.endswith('.npy')]
+                field_files = [entry.name for entry in field_entries]
                 
-                field_vectors = []
-                for file in tqdm(field_files, desc=f"Loading {field} embeddings"):
-                    embedding_path = os.path.join(field_path, file)
-                    try:
-                        embedding = np.load(embedding_path)
-                        # Normalize for cosine similarity
-                        embedding = embedding / np.linalg.norm(embedding)
-                        self.resume_embeddings[field][file] = embedding
-                        field_vectors.append(embedding)
-                    except Exception as e:
-                        logger.error(f"Error loading resume embedding {file}: {str(e)}")
+                # Only the running sum of normalized resume vectors is kept: its direction
+                # equals the mean's, so it normalizes to the same field embedding
+                field_sum = None
+                results = executor.map(_load_normalized, [entry.path for entry in field_entries])
+                for file, embedding in tqdm(zip(field_files, results), total=len(field_files),
+                                            desc=f"Loading {field} embeddings"):
+                    if isinstance(embedding, Exception):
+                        logger.error(f"Error loading resume embedding {file}: {str(embedding)}")
                         continue
+                    if field_sum is None:
+                        field_sum = embedding.astype(np.float64)
+                    else:
+                        field_sum += embedding
                 
-                # Calculate field embedding (average of all resumes in the field)
-                if field_vectors:
-                    field_embedding = np.mean(field_vectors, axis=0)
-                    # Normalize the mean vector
-                    self.field_embeddings[field] = field_embedding / np.linalg.norm(field_embedding)
+                # Calculate field embedding (normalized average of all resumes in the field)
+                if field_sum is not None:
+                    self.field_embeddings[field] = _normalize_rows(field_sum).astype(np.float32)
                 else:
                     logger.warning(f"No valid embeddings found for field: {field}")
         
+        self.field_names = list(self.field_embeddings.keys())
+        if self.field_names:
+            self.field_matrix = np.vstack(list(self.field_embeddings.values())).astype(np.float32, copy=False)
+        
+        self.job_names = [job_id.replace('.npy', '') for job_id in self.job_ids]
+        
         logger.info(f"Loaded {len(self.job_ids)} job embeddings")
         logger.info(f"Loaded resume embeddings for {len(self.field_embeddings)} fields")
     
+    def _load_packed_jobs(self, job_dir: str, job_files: List[str]) -> bool:
+        """
+        Load the job matrix from the directory's packed/ copy if it covers every job file
+        
+        The packed layout is one (jobs, dimension) float32 or float16 matrix.npy plus
+        ids.json with the source file name, modification time and size of each row.
+        It is only used while every source file is unchanged; it is memory-mapped and
+        normalized in float32 in one vectorized pass instead of reading a file per job.
+        """
+        packed_ids = current_packed_ids(job_dir, job_files)
+        if packed_ids is None:
+            if os.path.exists(os.path.join(job_dir, 'packed', 'ids.json')):
+                logger.info("Packed job embeddings are out of date, loading individual files")
+            return False
+        
+        matrix_path = os.path.join(job_dir, 'packed', 'matrix.npy')
+        matrix = np.load(matrix_path, mmap_mode='r')
+        # One float32 copy out of the mapping, then normalized in place
+        self.job_matrix = _normalize_rows(np.array(matrix, dtype=np.float32)).astype(self.job_dtype, copy=False)
+        self.job_ids = list(packed_ids)
+        logger.info(f"Loaded packed job embeddings from {matrix_path}")
+        return True
+    
     def find_matching_jobs(self, field: str, top_n: int = 10, include_negative: bool = True) -> Tuple[List[Tuple[str, float]], List[Tuple[str, float]]]:
-        """Find top N matching and bottom N non-matching jobs for a given field using FAISS"""
+        """Find top N matching and bottom N non-matching jobs for a given field"""
         field_embedding = self.field_embeddings[field].reshape(1, -1)
         
-        # Get all similarities to find both top and bottom matches
-        k = len(self.job_ids) if include_negative else top_n
-        similarities, indices = self.index.search(field_embedding, k)
+        # Rows are normalized, so one matrix-vector product gives every cosine similarity
+        similarities = self._similarities(field_embedding)[0]
+        positive_idx, negative_idx = self._split_matches(similarities, top_n, include_negative)
         
-        # Convert to list of (job_id, similarity) tuples
-        all_matches = [
-            (self.job_ids[idx], float(sim))
-            for sim, idx in zip(similarities[0], indices[0])
-        ]
-        
-        # Split into positive and negative matches
-        positive_matches = all_matches[:top_n]
-        negative_matches = all_matches[-top_n:] if include_negative else []
+        positive_matches = list(zip([self.job_ids[idx] for idx in positive_idx.tolist()],
+                                    similarities[positive_idx].tolist()))
+        negative_matches = list(zip([self.job_ids[idx] for idx in negative_idx.tolist()],
+                                    similarities[negative_idx].tolist()))
         
         return positive_matches, negative_matches
     
+    def _similarities(self, queries: np.ndarray, tile_rows: int = 65536, upcast_tile_rows: int = 4096) -> np.ndarray:
+        """
+        Compute the (queries x jobs) similarity matrix in float32
+        
+        The job matrix is row-major, so `job_matrix.T` is handed to BLAS as a
+        transposed operand without a copy. Large matrices are processed in
+        panels of `tile_rows` jobs so each panel is reused across all queries
+        while it is cache-resident; a reduced-precision job matrix is upcast
+        `upcast_tile_rows` rows at a time so the float32 copy stays cache-sized.
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if self.device is not None:
+            return self._device_similarities(queries)
+        
+        job_matrix = self.job_matrix
+        upcast = job_matrix.dtype != np.float32
+        if upcast:
+            tile_rows = upcast_tile_rows
+        
+        if len(job_matrix) <= tile_rows and not upcast:
+            return queries @ job_matrix.T
+        
+        similarities = np.empty((len(queries), len(job_matrix)), dtype=np.float32)
+        for start in range(0, len(job_matrix), tile_rows):
+            tile = job_matrix[start:start + tile_rows]
+            if upcast:
+                tile = tile.astype(np.float32)
+            similarities[:, start:start + tile_rows] = queries @ tile.T
+        return similarities
+    
+    def _device_similarities(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Compute the (queries x jobs) similarity matrix on self.device with torch
+        
+        The job matrix is uploaded once and kept in its storage dtype, so a
+        float16 matrix runs on tensor cores (with float16-rounded outputs); the
+        result is returned as float32.
+        """
+        if self._device_job_matrix is None:
+            self._device_job_matrix = torch.from_numpy(self.job_matrix).to(self.device)
+        job_matrix = self._device_job_matrix
+        
+        with torch.inference_mode():
+            query_tensor = torch.from_numpy(queries).to(device=job_matrix.device, dtype=job_matrix.dtype)
+            return (query_tensor @ job_matrix.T).float().cpu().numpy()
+    
+    def _split_matches(self, similarities: np.ndarray, top_n: int,
+                       include_negative: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """Select the job indices of one field's top N and bottom N similarities, best first"""
+        # Partition out the top and bottom N and sort only those, not every job
+        positive_idx = self._ranked_indices(-similarities, top_n)
+        # Bottom matches keep the descending order of the full ranking
+        negative_idx = self._ranked_indices(similarities, top_n)[::-1] if include_negative else positive_idx[:0]
+        return positive_idx, negative_idx
+    
+    @staticmethod
+    def _ranked_indices(keys: np.ndarray, n: int) -> np.ndarray:
+        """Indices of the `n` smallest keys in ascending order, via argpartition"""
+        if n < len(keys):
+            indices = np.argpartition(keys, n)[:n]
+        else:
+            indices = np.arange(len(keys))
+        return indices[np.argsort(keys[indices], kind='stable')]
+    
+    def _match_records(self, indices: np.ndarray, similarities: np.ndarray) -> List[Dict[str, object]]:
+        """Result records for the given job indices, with scores converted in one tolist() call"""
+        return [
+            {'job_id': self.job_names[idx], 'similarity_score': score}
+            for idx, score in zip(indices.tolist(), similarities[indices].tolist())
+        ]
+    
     def analyze_field_job_matches(self, output_dir: str, top_n: int = 10):
         """Analyze matches between fields and jobs, including both positive and negative matches"""
         Path(output_dir).mkdir(parents=True, exist_ok=True)
         
+        # Similarities of every field to every job from a single (fields x jobs) GEMM
+        similarity_matrix = self._similarities(self.field_matrix) if self.field_names else None
+        
         results = {}
-        for field in self.field_embeddings.keys():
+        for row, field in enumerate(self.field_names):
             logger.info(f"Analyzing matches for field: {field}")
             
             # Get top matching and least matching jobs
-            matching_jobs, negative_matches = self.find_matching_jobs(field, top_n)
+            similarities = similarity_matrix[row]
+            positive_idx, negative_idx = self._split_matches(similarities, top_n)
             
             # Store results
             results[field] = {
-                'top_matches': [
-                    {
-                        'job_id': job_id.replace('.npy', ''),
-                        'similarity_score': float(score)
-                    }
-                    for job_id, score in matching_jobs
-                ],
-                'least_matches': [
-                    {
-                        'job_id': job_id.replace('.npy', ''),
-                        'similarity_score': float(score)
-                    }
-                    for job_id, score in negative_matches
-                ]
+                'top_matches': self._match_records(positive_idx, similarities),
+                'least_matches': self._match_records(negative_idx, similarities)
             }
         
         # Save results
-        import json
         output_path = os.path.join(output_dir, 'field_job_matches.json')
-        with open(output_path, 'w') as f:
-            json.dump(results, f, indent=2)
+        with open(output_path, 'wb') as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
         
         logger.info(f"Analysis results saved to: {output_path}")
         return results
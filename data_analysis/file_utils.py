@@ -0,0 +1,47 @@
+import os
+import json
+import shutil
+from typing import List, Optional
+
+def link_or_copy(source_path: str, dest_path: str) -> None:
+    """Hardlink dest_path to source_path, copying only where the filesystem cannot link"""
+    try:
+        os.link(source_path, dest_path)
+    except FileExistsError:
+        # A link from an earlier run is already up to date; copying onto it would truncate the source
+        if not os.path.samefile(source_path, dest_path):
+            os.remove(dest_path)
+            link_or_copy(source_path, dest_path)
+    except OSError:
+        shutil.copy2(source_path, dest_path)
+
+def current_packed_ids(embedding_dir: str, filenames: List[str]) -> Optional[List[str]]:
+    """
+    Row file names of the directory's packed/ matrix, or None if it is missing or stale
+    
+    The pack is current only if it covers exactly `filenames` and every source
+    file still has the modification time and size recorded in packed/ids.json,
+    so a rewritten embedding is never served from an old pack.
+    """
+    matrix_path = os.path.join(embedding_dir, 'packed', 'matrix.npy')
+    ids_path = os.path.join(embedding_dir, 'packed', 'ids.json')
+    if not (os.path.exists(matrix_path) and os.path.exists(ids_path)):
+        return None
+    
+    with open(ids_path) as f:
+        sources = json.load(f)
+    # Packs written before sources were recorded hold bare names and are treated as stale
+    if not all(isinstance(source, dict) for source in sources):
+        return None
+    packed_ids = [source['id'] for source in sources]
+    if set(packed_ids) != set(filenames):
+        return None
+    
+    for source in sources:
+        try:
+            stat = os.stat(os.path.join(embedding_dir, source['id']))
+        except OSError:
+            return None
+        if stat.st_mtime_ns != source['mtime_ns'] or stat.st_size != source['size']:
+            return None
+    return packed_ids
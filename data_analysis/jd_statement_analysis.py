@@ -1,12 +1,30 @@
 import os
 import json
+import orjson
 import numpy as np
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, List, Tuple
 import pandas as pd
 from pathlib import Path
 from tqdm import tqdm  # Added for progress indication
 
+def _load_field_statements(filepath: str, fields: frozenset) -> Dict[str, list]:
+    """Parse one JD file with orjson and return the statement lists of the requested top-level fields"""
+    with open(filepath, 'rb') as f:
+        data = orjson.loads(f.read())
+    return {field: data[field] for field in fields if field in data}
+
+def _statement_lengths(statements: list) -> Tuple[np.ndarray, int]:
+    """
+    Word count of every statement and the number of distinct statements
+    
+    Both are computed over one string Series; counting non-whitespace runs
+    matches len(str(stmt).split()) without splitting each statement.
+    """
+    texts = pd.Series(statements, dtype=object).astype(str)
+    lengths = texts.str.count(r'\S+').to_numpy()
+    return lengths, int(texts.nunique())
+
 def analyze_job_statements(base_path: str) -> Dict:
     """
     Analyze job description statements from JSON files.
@@ -30,23 +48,25 @@ def analyze_job_statements(base_path: str) -> Dict:
         'educational_requirements'
     ]
     
+    field_set = frozenset(fields)
+    
     # Get total file count for progress bar
-    json_files = [f for f in os.listdir(base_path) if f.endswith('.json')]
+    with os.scandir(base_path) as entries:
+        json_files = [entry for entry in entries if entry.name.endswith('.json')]
     
     # Process each file with progress bar
     file_count = 0
-    for filename in tqdm(json_files, desc="Processing job descriptions", unit="file"):
+    for entry in tqdm(json_files, desc="Processing job descriptions", unit="file"):
         file_count += 1
-        with open(os.path.join(base_path, filename), 'r', encoding='utf-8') as f:
-            try:
-                data = json.load(f)
-                # Add statements to respective categories
-                for field in fields:
-                    if field in data:
-                        stats[field].extend(data[field])
-            except json.JSONDecodeError:
-                print(f"Error reading file: {filename}")
-                continue
+        try:
+            file_statements = _load_field_statements(entry.path, field_set)
+        except orjson.JSONDecodeError:
+            print(f"Error reading file: {entry.name}")
+            continue
+        # Add statements to respective categories
+        for field in fields:
+            if field in file_statements:
+                stats[field].extend(file_statements[field])
     
     print("\nCalculating statistics...")
     
@@ -61,21 +81,18 @@ def analyze_job_statements(base_path: str) -> Dict:
         if not statements:
             continue
             
-        # Calculate lengths of statements
-        lengths = [len(str(stmt).split()) for stmt in statements]
-        
-        # Get unique statements
-        unique_statements = set(str(stmt) for stmt in statements)
+        # Calculate lengths of statements and count the unique ones
+        lengths, unique_count = _statement_lengths(statements)
         
         category_stats = {
             'total_statements': len(statements),
             'mean_length': np.mean(lengths),
             'median_length': np.median(lengths),
             'std_length': np.std(lengths),
-            'min_length': min(lengths),
-            'max_length': max(lengths),
-            'unique_statements': len(unique_statements),
-            'duplicate_rate': 1 - (len(unique_statements) / len(statements)),
+            'min_length': int(lengths.min()),
+            'max_length': int(lengths.max()),
+            'unique_statements': unique_count,
+            'duplicate_rate': 1 - (unique_count / len(statements)),
             'sample_statements': list(statements[:3]) if statements else []
         }
         
@@ -88,18 +105,17 @@ def analyze_job_statements(base_path: str) -> Dict:
             all_statements.extend(stats[field])
     
     if all_statements:
-        lengths = [len(str(stmt).split()) for stmt in all_statements]
-        unique_statements = set(str(stmt) for stmt in all_statements)
+        lengths, unique_count = _statement_lengths(all_statements)
         
         analysis['overall_metrics'] = {
             'total_statements': len(all_statements),
             'mean_length': np.mean(lengths),
             'median_length': np.median(lengths),
             'std_length': np.std(lengths),
-            'min_length': min(lengths),
-            'max_length': max(lengths),
-            'unique_statements': len(unique_statements),
-            'duplicate_rate': 1 - (len(unique_statements) / len(all_statements)),
+            'min_length': int(lengths.min()),
+            'max_length': int(lengths.max()),
+            'unique_statements': unique_count,
+            'duplicate_rate': 1 - (unique_count / len(all_statements)),
             'statements_per_job': len(all_statements) / file_count if file_count > 0 else 0
         }
     
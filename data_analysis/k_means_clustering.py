@@ -1,64 +1,147 @@
 import os
 import numpy as np
-import shutil
 from tqdm import tqdm
 from pathlib import Path
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
+import faiss
+from sklearn.decomposition import IncrementalPCA
 import matplotlib.pyplot as plt
 import seaborn as sns
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from file_utils import current_packed_ids, link_or_copy
 
-def load_embeddings(embedding_dir: str):
-    """Load all embeddings from the directory"""
-    embeddings = []
-    filenames = []
+def load_packed_embeddings(embedding_dir: str, filenames: list):
+    """
+    Map the directory's packed/ matrix if it covers exactly `filenames`
     
+    Returns the memory-mapped (embeddings, filenames) rows of the pack, or None when
+    there is no pack or any of its source files changed since it was written.
+    """
+    packed_ids = current_packed_ids(embedding_dir, filenames)
+    if packed_ids is None:
+        return None
+    
+    return np.load(os.path.join(embedding_dir, 'packed', 'matrix.npy'), mmap_mode='r'), packed_ids
+
+def load_embeddings(embedding_dir: str, max_workers: int = 16, dtype: type = np.float16):
+    """
+    Load all embeddings from the directory, from its packed matrix when up to date
+    
+    Otherwise the files are read on a thread pool, each straight into its row of a
+    preallocated matrix. The default float16 storage halves the resident size;
+    clustering and PCA upcast only the rows they are working on.
+    """
     print("Loading embeddings...")
-    for file in tqdm(os.listdir(embedding_dir)):
-        if file.endswith('.npy'):
-            embedding_path = os.path.join(embedding_dir, file)
-            embedding = np.load(embedding_path)
-            embeddings.append(embedding.flatten())  # Flatten in case of 2D arrays
-            filenames.append(file)
-    
-    return np.array(embeddings), filenames
+    filenames = sorted(file for file in os.listdir(embedding_dir) if file.endswith('.npy'))
+    packed = load_packed_embeddings(embedding_dir, filenames)
+    if packed is not None:
+        return packed
+    if not filenames:
+        return np.empty((0, 0), dtype=dtype), filenames
+    
+    dim = np.load(os.path.join(embedding_dir, filenames[0]), mmap_mode='r').size
+    embeddings = np.empty((len(filenames), dim), dtype=dtype)
+    
+    def load_row(row: int):
+        # Mapped rather than read into a temporary array; flattened in case of 2D arrays
+        embeddings[row] = np.load(os.path.join(embedding_dir, filenames[row]), mmap_mode='r').ravel()
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(tqdm(executor.map(load_row, range(len(filenames))), total=len(filenames)))
+    
+    return embeddings, filenames
 
-def perform_clustering(embeddings: np.ndarray, n_clusters: int = 10):
-    """Perform k-means clustering"""
+def perform_clustering(embeddings: np.ndarray, n_clusters: int = 10, niter: int = 20,
+                       max_points_per_centroid: int = 256, tile_rows: int = 65536):
+    """
+    Perform k-means clustering with FAISS
+    
+    Training and the final assignment run as batched BLAS distance computations,
+    on the GPU when FAISS sees one. Centroids are trained in float32 on a sample of
+    at most `max_points_per_centroid` rows per cluster, the same cap FAISS applies
+    itself, and every row is then assigned in float32 tiles of `tile_rows`, so a
+    float16 matrix is never upcast as a whole.
+    """
     print(f"Performing k-means clustering with {n_clusters} clusters...")
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    cluster_labels = kmeans.fit_predict(embeddings)
+    n_rows = embeddings.shape[0]
+    sample_size = min(n_rows, n_clusters * max_points_per_centroid)
+    sample = np.sort(np.random.default_rng(42).choice(n_rows, size=sample_size, replace=False))
+    
+    kmeans = faiss.Kmeans(embeddings.shape[1], n_clusters, niter=niter, seed=42,
+                          max_points_per_centroid=max_points_per_centroid,
+                          gpu=faiss.get_num_gpus() > 0)
+    kmeans.train(np.ascontiguousarray(embeddings[sample], dtype=np.float32))
+    
+    cluster_labels = np.empty(n_rows, dtype=np.int64)
+    for start in range(0, n_rows, tile_rows):
+        tile = np.ascontiguousarray(embeddings[start:start + tile_rows], dtype=np.float32)
+        _, labels = kmeans.index.search(tile, 1)
+        cluster_labels[start:start + tile_rows] = labels.ravel()
     return cluster_labels, kmeans
 
-def visualize_clusters(embeddings: np.ndarray, labels: np.ndarray, output_dir: str):
-    """Visualize clusters using PCA"""
+def visualize_clusters(embeddings: np.ndarray, labels: np.ndarray, output_dir: str, batch_size: int = 4096,
+                       method: str = 'pca'):
+    """
+    Visualize clusters in two dimensions using PCA or UMAP
+    
+    With method='pca' the projection is fitted and applied with IncrementalPCA over
+    row batches, so only one float32 batch is materialized at a time instead of the
+    whole matrix. method='umap' projects the mean-centered, L2-normalized embeddings
+    with UMAP, whose nearest-neighbor graph and layout run in parallel numba kernels;
+    it separates clusters better but needs the whole matrix in memory.
+    """
     print("Reducing dimensionality for visualization...")
-    pca = PCA(n_components=2)
-    reduced_embeddings = pca.fit_transform(embeddings)
+    if method == 'umap':
+        # Optional dependency, only needed for this projection
+        import umap
+        
+        vectors = np.array(embeddings, dtype=np.float32)
+        vectors -= vectors.mean(axis=0)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), np.finfo(np.float32).tiny)
+        reduced_embeddings = umap.UMAP(n_components=2, low_memory=True, n_jobs=-1).fit_transform(vectors)
+        axis_labels = ('First UMAP Component', 'Second UMAP Component')
+    elif method == 'pca':
+        pca = IncrementalPCA(n_components=2)
+        # Near-equal batches, so the last one is never smaller than n_components
+        batches = np.array_split(np.arange(embeddings.shape[0]), max(1, -(-embeddings.shape[0] // batch_size)))
+        for rows in batches:
+            pca.partial_fit(np.asarray(embeddings[rows[0]:rows[-1] + 1], dtype=np.float32))
+        reduced_embeddings = np.vstack([
+            pca.transform(np.asarray(embeddings[rows[0]:rows[-1] + 1], dtype=np.float32)) for rows in batches
+        ])
+        axis_labels = ('First Principal Component', 'Second Principal Component')
+    else:
+        raise ValueError(f"Unknown visualization method: {method}")
     
     # Create scatter plot
     plt.figure(figsize=(12, 8))
     scatter = plt.scatter(reduced_embeddings[:, 0], reduced_embeddings[:, 1], 
                          c=labels, cmap='tab20', alpha=0.6)
-    plt.title('Job Description Clusters (PCA)')
-    plt.xlabel('First Principal Component')
-    plt.ylabel('Second Principal Component')
+    plt.title(f'Job Description Clusters ({method.upper()})')
+    plt.xlabel(axis_labels[0])
+    plt.ylabel(axis_labels[1])
     plt.colorbar(scatter)
     
     # Save plot
     plt.savefig(os.path.join(output_dir, 'clusters_visualization.png'))
     plt.close()
 
-def analyze_clusters(labels: np.ndarray, filenames: list, kmeans: KMeans, output_dir: str):
+def group_files_by_cluster(labels: np.ndarray, filenames: list) -> dict:
+    """Map each non-empty cluster, in ascending order, to its filenames in their original order"""
+    labels = np.asarray(labels)
+    counts = np.bincount(labels)
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    # A stable sort keeps each cluster's files in their original order
+    order = np.argsort(labels, kind='stable')
+    sorted_files = [filenames[i] for i in order.tolist()]
+    return {
+        cluster: sorted_files[bounds[cluster]:bounds[cluster + 1]]
+        for cluster in np.flatnonzero(counts).tolist()
+    }
+
+def analyze_clusters(labels: np.ndarray, filenames: list, kmeans: faiss.Kmeans, output_dir: str):
     """Analyze cluster distributions and save results"""
-    # Count documents per cluster
-    cluster_counts = defaultdict(int)
-    cluster_files = defaultdict(list)
-    
-    for label, filename in zip(labels, filenames):
-        cluster_counts[label] += 1
-        cluster_files[label].append(filename)
+    # Group documents per cluster; counts are the group sizes
+    cluster_files = group_files_by_cluster(labels, filenames)
     
     # Save analysis results
     analysis_file = os.path.join(output_dir, 'cluster_analysis.txt')
@@ -66,10 +149,10 @@ def analyze_clusters(labels: np.ndarray, filenames: list, kmeans: KMeans, output
         f.write("Cluster Analysis Results\n")
         f.write("=======================\n\n")
         
-        for cluster in sorted(cluster_counts.keys()):
+        for cluster, files in cluster_files.items():
             f.write(f"Cluster {cluster}:\n")
-            f.write(f"Number of documents: {cluster_counts[cluster]}\n")
-            f.write(f"Sample files: {', '.join(cluster_files[cluster][:5])}\n\n")
+            f.write(f"Number of documents: {len(files)}\n")
+            f.write(f"Sample files: {', '.join(files[:5])}\n\n")
     
     return cluster_files
 
@@ -80,11 +163,12 @@ def organize_files_by_cluster(labels: np.ndarray, filenames: list, txt_dir: str,
     Path(clustered_txt_dir).mkdir(exist_ok=True)
     
     # Create mapping of files to clusters
-    cluster_files = defaultdict(list)
-    for label, filename in zip(labels, filenames):
-        cluster_files[label].append(filename.replace('.npy', '.txt'))
+    cluster_files = {
+        cluster: [filename.replace('.npy', '.txt') for filename in files]
+        for cluster, files in group_files_by_cluster(labels, filenames).items()
+    }
     
-    # Copy files to respective cluster folders
+    # Link files into respective cluster folders
     for cluster, files in tqdm(cluster_files.items()):
         cluster_dir = os.path.join(clustered_txt_dir, f"cluster_{cluster}")
         Path(cluster_dir).mkdir(exist_ok=True)
@@ -95,7 +179,7 @@ def organize_files_by_cluster(labels: np.ndarray, filenames: list, txt_dir: str,
             
             try:
                 if os.path.exists(source_path):
-                    shutil.copy2(source_path, dest_path)
+                    link_or_copy(source_path, dest_path)
             except Exception as e:
                 print(f"Error copying {filename}: {str(e)}")
                 continue
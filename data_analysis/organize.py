@@ -1,7 +1,7 @@
 import os
-import shutil
 from pathlib import Path
 from tqdm import tqdm
+from file_utils import link_or_copy
 
 def organize_files_by_cluster():
     """
@@ -38,14 +38,14 @@ def organize_files_by_cluster():
         cluster_dir = os.path.join(output_base_dir, f"cluster_{cluster}")
         Path(cluster_dir).mkdir(exist_ok=True)
         
-        # Copy files to cluster directory
+        # Link files into cluster directory
         for filename in files:
             source_path = os.path.join(source_txt_dir, filename)
             dest_path = os.path.join(cluster_dir, filename)
             
             try:
                 if os.path.exists(source_path):
-                    shutil.copy2(source_path, dest_path)
+                    link_or_copy(source_path, dest_path)
             except Exception as e:
                 print(f"Error copying {filename}: {str(e)}")
                 continue
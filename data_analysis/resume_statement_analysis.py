@@ -1,65 +1,145 @@
 import os
 import json
+import orjson
 import numpy as np
-from collections import defaultdict
-from typing import Dict, List
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from tqdm import tqdm
 
-def analyze_resume_statements(base_path: str) -> Dict:
+# Fields to analyze
+FIELDS = [
+    'education',
+    'certifications',
+    'personality_traits'
+]
+
+# Per-skill values collected into skill_stats, in the order _parse_one returns them
+SKILL_COLUMNS = ['names', 'years', 'levels', 'descriptions', 'evidence']
+
+def _iter_json_files(path: str) -> Iterator[str]:
+    """
+    Yield the .json files under `path` recursively, in os.walk's top-down order
+    
+    Paths are produced while the tree is still being scanned, so parsing can start
+    before the walk finishes.
+    """
+    subdirs = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                # Like os.walk, symlinked directories are not followed
+                if not entry.is_symlink():
+                    subdirs.append(entry.path)
+            elif entry.name.endswith('.json'):
+                yield entry.path
+    for subdir in subdirs:
+        yield from _iter_json_files(subdir)
+
+def _parse_one(filepath: str) -> Optional[Tuple[List[list], Tuple[list, ...]]]:
+    """
+    Extract the analyzed values of one resume JSON file
+    
+    Returns:
+        The statements of each field in FIELDS and one list per SKILL_COLUMNS
+        entry with the values of all skills (evidence statements flattened),
+        or None if the file is not valid JSON
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            data = orjson.loads(f.read())
+    except orjson.JSONDecodeError:
+        print(f"Error reading file: {filepath}")
+        return None
+    
+    field_values = [data.get(field, []) for field in FIELDS]
+    
+    # Skills are nested objects; collect them column-wise so the parent extends each list once per file
+    names, years, levels, descriptions, evidence = [], [], [], [], []
+    for skill in data.get('skills', ()):
+        names.append(skill['name'])
+        years.append(skill['years'])
+        levels.append(skill['level'])
+        descriptions.append(skill['description'])
+        # Add each evidence statement separately
+        evidence.extend(skill['evidence'])
+    return field_values, (names, years, levels, descriptions, evidence)
+
+def _word_counts(statements: list) -> np.ndarray:
+    """Number of whitespace-separated words in each statement, as one int32 array"""
+    return np.fromiter((len(str(stmt).split()) for stmt in statements), dtype=np.int32, count=len(statements))
+
+def _length_stats(lengths: np.ndarray) -> Dict:
+    """
+    Mean, median, population std, min and max of word counts
+    
+    The sum and the sum of squares are exact integers from one pass each, so the
+    std needs no second pass around the mean. The median then partitions the array
+    in place instead of sorting it.
+    """
+    n = lengths.size
+    total = int(lengths.sum(dtype=np.int64))
+    total_squares = int(np.dot(lengths.astype(np.int64), lengths))
+    minimum, maximum = int(lengths.min()), int(lengths.max())
+    
+    middle = n // 2
+    if n % 2:
+        lengths.partition(middle)
+        median = float(lengths[middle])
+    else:
+        lengths.partition([middle - 1, middle])
+        median = (float(lengths[middle - 1]) + float(lengths[middle])) / 2
+    
+    return {
+        'mean_length': total / n,
+        'median_length': median,
+        'std_length': float(np.sqrt((n * total_squares - total * total) / (n * n))),
+        'min_length': minimum,
+        'max_length': maximum
+    }
+
+def analyze_resume_statements(base_path: str, max_workers: int = None,
+                              chunksize: int = 64) -> Dict:
     """
     Analyze resume statements from JSON files.
     
+    Files are parsed in parallel on `max_workers` processes, `chunksize` files per
+    task, and merged in file order.
+    
     Args:
         base_path: Path to the directory containing resume JSON files
+        max_workers: Number of parser processes (default: one less than the CPU count)
+        chunksize: Files handed to a parser process at a time
         
     Returns:
         Dictionary containing analysis results
     """
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 2) - 1)
+    
     # Initialize containers for analysis
     stats = defaultdict(list)
     skill_stats = defaultdict(list)
+    fields = FIELDS
     
-    # Fields to analyze
-    fields = [
-        'education',
-        'certifications',
-        'personality_traits'
-    ]
-    
-    # Get all JSON files recursively (including subdirectories)
-    json_files = []
-    for root, _, files in os.walk(base_path):
-        for file in files:
-            if file.endswith('.json'):
-                json_files.append(os.path.join(root, file))
-    
-    # Process each file with progress bar
+    # Process each file with progress bar; JSON files are found recursively (including subdirectories)
+    # and handed to the workers while the directory walk is still running
     file_count = 0
-    for filepath in tqdm(json_files, desc="Processing resumes", unit="file"):
-        file_count += 1
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-                # Process regular fields
-                for field in fields:
-                    if field in data:
-                        stats[field].extend(data[field])
-                
-                # Process skills separately due to nested structure
-                if 'skills' in data:
-                    for skill in data['skills']:
-                        # Add skill name to list of skills
-                        skill_stats['names'].append(skill['name'])
-                        skill_stats['years'].append(skill['years'])
-                        skill_stats['levels'].append(skill['level'])
-                        skill_stats['descriptions'].append(skill['description'])
-                        # Add each evidence statement separately
-                        skill_stats['evidence'].extend(skill['evidence'])
-                        
-        except json.JSONDecodeError:
-            print(f"Error reading file: {filepath}")
-            continue
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        parsed_files = executor.map(_parse_one, _iter_json_files(base_path), chunksize=chunksize)
+        for parsed in tqdm(parsed_files, desc="Processing resumes", unit="file"):
+            file_count += 1
+            if parsed is None:
+                continue
+            
+            field_values, skill_columns = parsed
+            # Process regular fields
+            for field, values in zip(fields, field_values):
+                stats[field].extend(values)
+            
+            # Skills arrive column-wise, one list per SKILL_COLUMNS entry
+            for column, values in zip(SKILL_COLUMNS, skill_columns):
+                skill_stats[column].extend(values)
     
     print("\nCalculating statistics...")
     
@@ -76,17 +156,13 @@ def analyze_resume_statements(base_path: str) -> Dict:
         if not statements:
             continue
             
-        lengths = [len(str(stmt).split()) for stmt in statements]
+        length_stats = _length_stats(_word_counts(statements))
         unique_statements = set(str(stmt) for stmt in statements)
         
         category_stats = {
             'total_statements': len(statements),
             'statements_per_resume': len(statements) / file_count if file_count > 0 else 0,
-            'mean_length': np.mean(lengths),
-            'median_length': np.median(lengths),
-            'std_length': np.std(lengths),
-            'min_length': min(lengths),
-            'max_length': max(lengths),
+            **length_stats,
             'unique_statements': len(unique_statements),
             'duplicate_rate': 1 - (len(unique_statements) / len(statements)),
             'sample_statements': list(statements[:3]) if statements else []
@@ -96,15 +172,17 @@ def analyze_resume_statements(base_path: str) -> Dict:
     
     # Process skills statistics
     if skill_stats['names']:
-        unique_skills = set(skill_stats['names'])
+        # One counting pass each instead of a list.count per distinct value
+        skill_counts = Counter(skill_stats['names'])
+        level_counts = Counter(skill_stats['levels'])
         skill_years = np.array(skill_stats['years'])
         
         # Analyze skill evidence statements
-        evidence_lengths = [len(str(stmt).split()) for stmt in skill_stats['evidence']]
+        evidence_stats = _length_stats(_word_counts(skill_stats['evidence']))
         unique_evidence = set(str(stmt) for stmt in skill_stats['evidence'])
         
         analysis['skills_analysis'] = {
-            'unique_skills': len(unique_skills),
+            'unique_skills': len(skill_counts),
             'total_skill_mentions': len(skill_stats['names']),
             'skills_per_resume': len(skill_stats['names']) / file_count if file_count > 0 else 0,
             'years_of_experience': {
@@ -115,22 +193,15 @@ def analyze_resume_statements(base_path: str) -> Dict:
                 'max': np.max(skill_years)
             },
             'level_distribution': {
-                level: skill_stats['levels'].count(level) / len(skill_stats['levels'])
-                for level in set(skill_stats['levels'])
+                level: count / len(skill_stats['levels'])
+                for level, count in level_counts.items()
             },
             'evidence_statements': {
                 'total': len(skill_stats['evidence']),
                 'unique': len(unique_evidence),
-                'mean_length': np.mean(evidence_lengths),
-                'median_length': np.median(evidence_lengths),
-                'std_length': np.std(evidence_lengths),
-                'min_length': min(evidence_lengths),
-                'max_length': max(evidence_lengths)
+                **evidence_stats
             },
-            'top_skills': sorted([(skill, skill_stats['names'].count(skill)) 
-                                for skill in unique_skills], 
-                               key=lambda x: x[1], 
-                               reverse=True)[:10]
+            'top_skills': skill_counts.most_common(10)
         }
     
     return analysis
@@ -0,0 +1,180 @@
+import io
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from pathlib import Path
+from collections import OrderedDict
+from typing import List, Optional
+from embeddings.text_preprocessing import normalize_for_embedding, MAX_EMBEDDING_CHARS
+
+DEFAULT_CACHE_PATH = "data/embedding_cache.sqlite"
+# Keys bound per SELECT; older SQLite builds allow at most 999 parameters per statement
+MAX_QUERY_PARAMS = 900
+
+_WHITESPACE = re.compile(r'\s+')
+
+class EmbeddingCache:
+    """
+    On-disk exact-match cache from text content to its embedding
+
+    Entries live in one SQLite table keyed by a blake2b digest of the model
+    namespace and the whitespace-normalized text, so duplicate documents are
+    embedded once no matter which file or run they come from. Vectors are
+    stored in .npy format, keeping the dtype and shape the model returned.
+    
+    With `memory_size` set, the most recently used entries are also kept in
+    memory; with `path=None` only that in-memory LRU is used and nothing is
+    written to disk. An instance may be shared between threads.
+    """
+    def __init__(self, namespace: str, path: Optional[str] = DEFAULT_CACHE_PATH, memory_size: int = 0):
+        """
+        Args:
+            namespace: Name of the embedding model; caches of different models never collide
+            path: SQLite database file, shared by every namespace; None keeps entries in memory only
+            memory_size: Number of entries kept in an in-memory LRU in front of the database
+        """
+        self.namespace = namespace.encode('utf-8')
+        self.memory_size = memory_size
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.connection = None
+        if path is None:
+            return
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Access is serialized by self.lock, so the connection may be used from any thread
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vec BLOB)")
+        self.connection.commit()
+
+    def key(self, text: str) -> bytes:
+        """Digest of the text with runs of whitespace collapsed"""
+        normalized = _WHITESPACE.sub(' ', text).strip()
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16, key=self.namespace[:64]).digest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Return the cached embedding of `text`, or None on a miss"""
+        return self.get_many([text])[0]
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Return the cached embedding of each text, with None for misses"""
+        keys = [self.key(text) for text in texts]
+        with self.lock:
+            found = {}
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+            
+            unresolved = list(set(keys) - found.keys())
+            if self.connection is not None:
+                # Looked up in chunks that stay under SQLite's bound-parameter limit
+                for start in range(0, len(unresolved), MAX_QUERY_PARAMS):
+                    chunk = unresolved[start:start + MAX_QUERY_PARAMS]
+                    rows = self.connection.execute(
+                        f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    for key, vec in rows:
+                        found[key] = np.load(io.BytesIO(vec))
+                        self._remember(key, found[key])
+        return [found.get(key) for key in keys]
+
+    def put(self, text: str, embedding: np.ndarray) -> None:
+        """Store the embedding of `text`"""
+        self.put_many([text], [embedding])
+
+    def put_many(self, texts: List[str], embeddings: List[np.ndarray]) -> None:
+        """Store the embedding of each text in one transaction"""
+        keys = [self.key(text) for text in texts]
+        entries = []
+        if self.connection is not None:
+            for key, embedding in zip(keys, embeddings):
+                buffer = io.BytesIO()
+                np.save(buffer, np.asarray(embedding))
+                entries.append((key, buffer.getvalue()))
+        with self.lock:
+            if entries:
+                with self.connection:
+                    self.connection.executemany("INSERT OR IGNORE INTO embeddings (key, vec) VALUES (?, ?)", entries)
+            for key, embedding in zip(keys, embeddings):
+                self._remember(key, embedding)
+
+    def _remember(self, key: bytes, embedding: np.ndarray) -> None:
+        """Keep an entry in the in-memory LRU, evicting the least recently used beyond memory_size"""
+        if self.memory_size <= 0:
+            return
+        self.memory[key] = embedding
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def seed_from_directory(self, text_dir: str, embedding_dir: str,
+                            max_chars: Optional[int] = MAX_EMBEDDING_CHARS, batch_size: int = 1000,
+                            dtype: type = np.float32) -> int:
+        """
+        Store embeddings that were already computed for the texts of a directory
+        
+        Every .txt file under `text_dir` whose .npy counterpart exists at the same
+        relative path under `embedding_dir` is keyed the way the embedders key their
+        lookups, i.e. on its text normalized with `max_chars`. A fresh cache (a new
+        machine, a deleted database, a new output directory) then starts warm instead
+        of re-sending every known document to the model.
+        
+        Only files of `dtype`, the dtype the model returns, are seeded; outputs saved
+        at a lower precision (e.g. float16 by `save_embedding`) would otherwise be
+        served in place of the model's own vectors. The seeded vectors are assumed to
+        have been computed from the normalized text, as every embedder does now;
+        outputs written before the embedders normalized their input were computed
+        from the raw text, so regenerate those before seeding from them.
+        
+        Returns:
+            int: Number of embeddings seeded
+        """
+        texts, embeddings = [], []
+        seeded = 0
+        for root, _, filenames in os.walk(text_dir):
+            embedding_root = os.path.join(embedding_dir, os.path.relpath(root, text_dir))
+            for filename in filenames:
+                if not filename.endswith('.txt'):
+                    continue
+                embedding_path = os.path.join(embedding_root, filename[:-len('.txt')] + '.npy')
+                if not os.path.exists(embedding_path):
+                    continue
+                embedding = np.load(embedding_path, allow_pickle=False)
+                if embedding.dtype != dtype:
+                    continue
+                
+                with open(os.path.join(root, filename), 'r', encoding='utf-8') as f:
+                    text = normalize_for_embedding(f.read(), max_chars=max_chars)
+                if not text:
+                    continue
+                texts.append(text)
+                embeddings.append(embedding)
+                
+                if len(texts) == batch_size:
+                    self.put_many(texts, embeddings)
+                    seeded += len(texts)
+                    texts, embeddings = [], []
+        
+        if texts:
+            self.put_many(texts, embeddings)
+            seeded += len(texts)
+        return seeded
+
+    def close(self) -> None:
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+
+if __name__ == "__main__":
+    # Warm the shared cache with the embeddings the pipelines have already written.
+    # SFR job description embeddings are saved as float16, so they are not seeded:
+    # the cache must return the full-precision vectors the endpoint itself would.
+    cache = EmbeddingCache('b1ade')
+    count = cache.seed_from_directory("data/resume/format_txt", "data/resume/format_embedding")
+    print(f"Seeded {count} B1ade resume embeddings")
+    cache.close()
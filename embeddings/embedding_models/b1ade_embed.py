@@ -3,6 +3,8 @@ from ai_systems.utils.utils import BaseValidator
 import torch
 from transformers import AutoTokenizer, AutoModel
 import gc  # For garbage collection on CPU
+import numpy as np
+from typing import List
 
 import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -76,6 +78,44 @@ class B1adeEmbed(BaseEmbedding):
         # Return the mean of the hidden states as the sentence embedding
         return outputs.last_hidden_state.mean(dim=1).cpu().numpy()
 
+    def get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        Get the embeddings of a batch of sentences with a single forward pass.
+
+        Padding positions are masked out of the mean, so each row equals what
+        get_embedding returns for that sentence alone.
+
+        :param texts: A list of strings representing the sentences.
+        :return: An array of shape (len(texts), embedding_dim).
+        """
+        logger.debug("Validating input texts for get_embeddings method")
+        self.validator.type_check(obj=texts, obj_type=list, obj_name='texts')
+        
+        # Tokenize the whole batch, padded to its longest sentence
+        logger.debug("Tokenizing %d input texts", len(texts))
+        inputs = self.tokenizer(
+            texts, 
+            return_tensors='pt', 
+            padding=True, 
+            truncation=True, 
+            max_length=512  # Adjust to model's actual max length if needed
+        )
+
+        # Move inputs to GPU if available
+        if torch.cuda.is_available():
+            logger.debug("Moving inputs to GPU")
+            inputs = {key: tensor.cuda() for key, tensor in inputs.items()}
+
+        logger.debug("Generating embeddings from the model")
+        with torch.inference_mode():
+            outputs = self.model(**inputs)
+            # Mean of the hidden states over each sentence's real tokens
+            mask = inputs['attention_mask'].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+            summed = (outputs.last_hidden_state * mask).sum(dim=1)
+            embeddings = summed / mask.sum(dim=1).clamp(min=1)
+        
+        return embeddings.cpu().numpy()
+
     @classmethod
     def free_memory(cls):
         """
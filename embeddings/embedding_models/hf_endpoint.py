@@ -0,0 +1,51 @@
+from .. import BaseEmbedding
+from ai_systems.utils.utils import BaseValidator
+
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from embeddings.embedding_cache import EmbeddingCache
+
+# Embeddings kept in memory, in front of the on-disk cache when one is configured
+MEMORY_CACHE_SIZE = 100_000
+# Pooled keep-alive connections per endpoint session
+HTTP_POOL_SIZE = 32
+
+def create_endpoint_session(headers: dict) -> requests.Session:
+    """
+    Session with pooled keep-alive connections that retries 429/503 responses with backoff
+    
+    The last response is returned rather than raised, so callers still handle it
+    with their own status checks.
+    """
+    session = requests.Session()
+    session.headers.update(headers)
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=Retry(
+        total=3, backoff_factor=0.3, status_forcelist=[429, 503],
+        allowed_methods=frozenset(['POST']), raise_on_status=False
+    ))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+class HuggingFaceEndpoint(BaseEmbedding):
+    """Shared setup of the Hugging Face inference endpoint embedders"""
+    # Cache namespace of the endpoint's model; set by each subclass
+    cache_namespace: str = None
+    
+    def __init__(self, api_url: str, headers: dict, cache_dir: str = None):
+        """
+        Args:
+            api_url: Inference endpoint URL
+            headers: Request headers, including the authorization token
+            cache_dir: Directory of the persistent embedding_cache.sqlite; without
+                one, embeddings are only cached in memory for this instance
+        """
+        self.api_url = api_url
+        self.headers = headers
+        self.validator = BaseValidator()
+        # Keyed on a stable digest of the text rather than the per-process hash()
+        cache_path = os.path.join(cache_dir, "embedding_cache.sqlite") if cache_dir else None
+        self.cache = EmbeddingCache(self.cache_namespace, cache_path, memory_size=MEMORY_CACHE_SIZE)
+        self.session = create_endpoint_session(self.headers)
@@ -1,5 +1,4 @@
-from .. import BaseEmbedding
-from ai_systems.utils.utils import BaseValidator
+from .hf_endpoint import HuggingFaceEndpoint
 from ai_systems.utils.exceptions import ModelServiceError, PayloadTooLargeError, EmbeddingError
 
 import requests
@@ -15,6 +14,7 @@ from ai_systems.utils.exceptions import (
     TokenExceededError
 )
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 load_dotenv(override=True)
@@ -31,12 +31,20 @@ HEADERS = {
     "Content-Type": "application/json",
 }
 
-class MixedBreadLargeV1HuggingFaceEndpoint(BaseEmbedding):
+def _as_row(embedding: np.ndarray) -> np.ndarray:
+    """
+    Reshape one text's embedding to the (1, dimension) shape of a single-text response
+    
+    Single and batched requests are cached under the same key, so every entry is
+    stored and returned in this one shape.
+    """
+    return embedding.reshape(1, -1)
+
+class MixedBreadLargeV1HuggingFaceEndpoint(HuggingFaceEndpoint):
+    cache_namespace = 'mxbai'
+    
     def __init__(self, api_url=API_URL, headers=HEADERS, cache_dir=None):
-        self.api_url = api_url
-        self.headers = headers
-        self.validator = BaseValidator()
-        self.cache = {}  # Simple in-memory cache
+        super().__init__(api_url, headers, cache_dir)
         logger.info("HuggingfaceEmbedder initialized with API URL: %s", self.api_url)
 
     def get_embedding(self, text: str, should_chunk: bool = False):
@@ -46,10 +54,10 @@ class MixedBreadLargeV1HuggingFaceEndpoint(BaseEmbedding):
             self.validator.type_check(obj=text, obj_type=str, obj_name='text')
             
             # Check cache first
-            cache_key = hash(text)
-            if cache_key in self.cache:
+            cached = self.cache.get(text)
+            if cached is not None:
                 logger.debug("Cache hit for text")
-                return self.cache[cache_key]
+                return _as_row(cached)
 
             # If previous attempt failed with PayloadTooLarge or text is long, chunk it
             if should_chunk:  # Conservative token estimate
@@ -59,7 +67,7 @@ class MixedBreadLargeV1HuggingFaceEndpoint(BaseEmbedding):
                 
                 for chunk in chunks:
                     payload = {"inputs": chunk, "parameters": {}}
-                    response = requests.post(self.api_url, headers=self.headers, json=payload)
+                    response = self.session.post(self.api_url, json=payload)
                     
                     if response.status_code == 200:
                         chunk_embeddings.append(np.array(response.json()))
@@ -72,18 +80,18 @@ class MixedBreadLargeV1HuggingFaceEndpoint(BaseEmbedding):
                 if not chunk_embeddings:
                     raise EmbeddingError("No valid embeddings generated from chunks")
                     
-                embeddings = np.mean(chunk_embeddings, axis=0)
-                self.cache[cache_key] = embeddings
+                embeddings = _as_row(np.mean(chunk_embeddings, axis=0))
+                self.cache.put(text, embeddings)
                 return embeddings
 
             # Regular request without chunking
             logger.info("Sending request to Huggingface API for text embedding")
             payload = {"inputs": text, "parameters": {}}
-            response = requests.post(self.api_url, headers=self.headers, json=payload)
+            response = self.session.post(self.api_url, json=payload)
             
             if response.status_code == 200:
-                embeddings = np.array(response.json())
-                self.cache[cache_key] = embeddings
+                embeddings = _as_row(np.array(response.json()))
+                self.cache.put(text, embeddings)
                 return embeddings
             elif response.status_code == 413:
                 logger.info("Payload too large, will retry with chunking")
@@ -101,6 +109,78 @@ class MixedBreadLargeV1HuggingFaceEndpoint(BaseEmbedding):
             logger.error(f"Unexpected error during embedding: {str(e)}")
             raise ModelServiceError(f"Embedding generation failed: {str(e)}")
 
+    def get_embeddings(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Get embeddings for many texts, sending up to `batch_size` texts per request
+        
+        Cached and repeated texts are sent once. A batch rejected as too large falls back to
+        get_embedding per text, which chunks long texts. Returns a
+        (len(texts), dimension) array whose rows follow the order of `texts`.
+        """
+        self.validator.type_check(obj=texts, obj_type=list, obj_name='texts')
+        if not texts:
+            raise ValueError("texts must not be empty")
+        cache_keys = [self.cache.key(text) for text in texts]
+        rows = self.cache.get_many(texts)
+        # First index of each uncached text, so repeated texts are sent once
+        missing, seen = [], set()
+        for i, (key, row) in enumerate(zip(cache_keys, rows)):
+            if row is None and key not in seen:
+                seen.add(key)
+                missing.append(i)
+        fetched = {}
+        
+        try:
+            for start in range(0, len(missing), batch_size):
+                batch = missing[start:start + batch_size]
+                logger.info("Sending request to Huggingface API for %d text embeddings", len(batch))
+                payload = {"inputs": [texts[i] for i in batch], "parameters": {}}
+                response = self.session.post(self.api_url, json=payload)
+                
+                if response.status_code == 200:
+                    embeddings = response.json()
+                    if not isinstance(embeddings, list) or len(embeddings) != len(batch):
+                        raise ModelServiceError(f"Unexpected response format: {embeddings}")
+                    batch_rows = [_as_row(np.array(embedding)) for embedding in embeddings]
+                    self.cache.put_many([texts[i] for i in batch], batch_rows)
+                    for i, row in zip(batch, batch_rows):
+                        fetched[cache_keys[i]] = row
+                elif response.status_code == 413:
+                    logger.info("Batch payload too large, embedding its texts one by one")
+                    for i in batch:
+                        fetched[cache_keys[i]] = self.get_embedding(texts[i])
+                elif response.status_code == 429:
+                    raise ModelServiceError("API rate limit exceeded")
+                elif response.status_code == 503:
+                    raise ModelServiceError("Service temporarily unavailable")
+                else:
+                    raise ModelServiceError(f"API error: {response.status_code}")
+
+        except requests.exceptions.RequestException as e:
+            raise ModelServiceError(f"Request failed: {str(e)}")
+        except ModelServiceError:
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error during batch embedding: {str(e)}")
+            raise ModelServiceError(f"Batch embedding generation failed: {str(e)}")
+        
+        return np.vstack([fetched[key] if row is None else row for key, row in zip(cache_keys, rows)])
+
+    def get_embeddings_parallel(self, texts: List[str], concurrency: int = 16, batch_size: int = 32) -> np.ndarray:
+        """
+        get_embeddings with up to `concurrency` batch requests in flight at once
+        
+        Batches are sent from a thread pool over the session's pooled connections,
+        so the server works on several while others are waiting on the network.
+        Returns a (len(texts), dimension) array whose rows follow the order of `texts`.
+        """
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        if len(batches) <= 1:
+            return self.get_embeddings(texts, batch_size=batch_size)
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as executor:
+            results = list(executor.map(lambda batch: self.get_embeddings(batch, batch_size=batch_size), batches))
+        return np.vstack(results)
+
     def _chunk_text(self, text: str, max_tokens: int = 512) -> List[str]:
         """Split text into chunks based on token limit
         
@@ -3,9 +3,12 @@ from ai_systems.utils.utils import BaseValidator
 from ai_systems.utils.exceptions import ModelServiceError
 
 import requests
+import aiohttp
+from requests.adapters import HTTPAdapter
 import logging
 import os
 import numpy as np
+from typing import List
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
@@ -20,12 +23,23 @@ HEADERS = {
     "Authorization": f"Bearer {HF_TOKEN}",
     "Content-Type": "application/json",
 }
+# Texts sent per request by get_embeddings_batch callers
+EMBED_BATCH_SIZE = 64
+# Pooled connections kept open to the endpoint; threaded callers should not run more workers than this
+HTTP_POOL_SIZE = 100
+
+# Shared by every endpoint instance so requests reuse open connections instead of
+# paying a new TCP and TLS handshake per call
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount("https://", HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+HTTP_SESSION.mount("http://", HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
 
 class SFREmbeddingEndpoint(BaseEmbedding):
-    def __init__(self, api_url=API_URL, headers=HEADERS):
+    def __init__(self, api_url=API_URL, headers=HEADERS, use_cache: bool = True):
         self.api_url = api_url
         self.headers = headers
         self.validator = BaseValidator()
+        self.use_cache = use_cache  # Results are only kept when True
         self.cache = {}
         logger.info("SFREmbeddingEndpoint initialized with API URL: %s", self.api_url)
 
@@ -35,7 +49,7 @@ class SFREmbeddingEndpoint(BaseEmbedding):
             self.validator.type_check(obj=text, obj_type=str, obj_name='text')
             
             cache_key = hash(text)
-            if cache_key in self.cache:
+            if self.use_cache and cache_key in self.cache:
                 return self.cache[cache_key]
 
             payload = {
@@ -43,13 +57,14 @@ class SFREmbeddingEndpoint(BaseEmbedding):
             }
             
             logger.info("Sending request to SFR API for text embedding")
-            response = requests.post(self.api_url, headers=self.headers, json=payload)
+            response = HTTP_SESSION.post(self.api_url, headers=self.headers, json=payload)
             
             if response.status_code == 200:
                 embedding = response.json()
                 if isinstance(embedding, list) and len(embedding) > 0:
                     embedding_array = np.array(embedding)
-                    self.cache[cache_key] = embedding_array
+                    if self.use_cache:
+                        self.cache[cache_key] = embedding_array
                     return embedding_array
                 else:
                     raise ModelServiceError(f"Unexpected response format: {embedding}")
@@ -58,4 +73,79 @@ class SFREmbeddingEndpoint(BaseEmbedding):
 
         except Exception as e:
             logger.error(f"Error during embedding: {str(e)}")
-            raise ModelServiceError(f"Embedding generation failed: {str(e)}")
\ No newline at end of file
+            raise ModelServiceError(f"Embedding generation failed: {str(e)}")
+
+    def _batch_misses(self, texts: List[str]):
+        """Return the cache keys of `texts` and the indices of those not cached yet"""
+        self.validator.type_check(obj=texts, obj_type=list, obj_name='texts')
+        cache_keys = [hash(text) for text in texts]
+        missing = [i for i, key in enumerate(cache_keys) if key not in self.cache]
+        return cache_keys, missing
+
+    def _merge_batch(self, cache_keys: List[int], missing: List[int], embeddings) -> np.ndarray:
+        """Validate a batch response and stack it with the cached rows in input order"""
+        if not isinstance(embeddings, list) or len(embeddings) != len(missing):
+            raise ModelServiceError(f"Unexpected response format: {embeddings}")
+        rows = [self.cache.get(key) for key in cache_keys]
+        for i, embedding in zip(missing, embeddings):
+            rows[i] = np.array(embedding)
+            if self.use_cache:
+                self.cache[cache_keys[i]] = rows[i]
+        return np.vstack(rows)
+
+    def get_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Get embeddings for a batch of texts with a single request
+        
+        Texts already in the cache are not resent. Returns a (len(texts), dimension)
+        array whose rows follow the order of `texts`.
+        """
+        try:
+            cache_keys, missing = self._batch_misses(texts)
+            
+            embeddings = []
+            if missing:
+                payload = {
+                    "inputs": [texts[i] for i in missing]
+                }
+                
+                logger.info("Sending request to SFR API for %d text embeddings", len(missing))
+                response = HTTP_SESSION.post(self.api_url, headers=self.headers, json=payload)
+                
+                if response.status_code != 200:
+                    raise ModelServiceError(f"API error: {response.status_code}, {response.text}")
+                embeddings = response.json()
+            
+            return self._merge_batch(cache_keys, missing, embeddings)
+
+        except Exception as e:
+            logger.error(f"Error during batch embedding: {str(e)}")
+            raise ModelServiceError(f"Batch embedding generation failed: {str(e)}")
+
+    async def get_embeddings_batch_async(self, session: aiohttp.ClientSession, texts: List[str]) -> np.ndarray:
+        """
+        Async get_embeddings_batch that sends its request through a shared aiohttp session
+        
+        Reusing one session keeps connections (and their TLS sessions) pooled across
+        requests instead of opening one per call.
+        """
+        try:
+            cache_keys, missing = self._batch_misses(texts)
+            
+            embeddings = []
+            if missing:
+                payload = {
+                    "inputs": [texts[i] for i in missing]
+                }
+                
+                logger.info("Sending request to SFR API for %d text embeddings", len(missing))
+                async with session.post(self.api_url, headers=self.headers, json=payload) as response:
+                    if response.status != 200:
+                        raise ModelServiceError(f"API error: {response.status}, {await response.text()}")
+                    embeddings = await response.json()
+            
+            return self._merge_batch(cache_keys, missing, embeddings)
+
+        except Exception as e:
+            logger.error(f"Error during batch embedding: {str(e)}")
+            raise ModelServiceError(f"Batch embedding generation failed: {str(e)}")
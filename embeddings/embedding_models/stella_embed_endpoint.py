@@ -1,5 +1,4 @@
-from .. import BaseEmbedding
-from ai_systems.utils.utils import BaseValidator
+from .hf_endpoint import HuggingFaceEndpoint
 from ai_systems.utils.exceptions import ModelServiceError, PayloadTooLargeError, EmbeddingError
 
 import requests
@@ -15,6 +14,7 @@ from ai_systems.utils.exceptions import (
     TokenExceededError
 )
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 load_dotenv(override=True)
@@ -31,12 +31,11 @@ HEADERS = {
     "Content-Type": "application/json",
 }
 
-class StellaEndpoint(BaseEmbedding):
+class StellaEndpoint(HuggingFaceEndpoint):
+    cache_namespace = 'stella'
+    
     def __init__(self, api_url=API_URL, headers=HEADERS, cache_dir=None):
-        self.api_url = api_url
-        self.headers = headers
-        self.validator = BaseValidator()
-        self.cache = {}
+        super().__init__(api_url, headers, cache_dir)
         logger.info("StellaEndpoint initialized with API URL: %s", self.api_url)
 
     def get_embedding(self, text: str, should_chunk: bool = False):
@@ -44,9 +43,9 @@ class StellaEndpoint(BaseEmbedding):
         try:
             self.validator.type_check(obj=text, obj_type=str, obj_name='text')
             
-            cache_key = hash(text)
-            if cache_key in self.cache:
-                return self.cache[cache_key]
+            cached = self.cache.get(text)
+            if cached is not None:
+                return cached
 
             # Simplify the payload structure
             payload = {
@@ -57,7 +56,7 @@ class StellaEndpoint(BaseEmbedding):
             }
             
             logger.info(f"Sending request with payload: {payload}")
-            response = requests.post(self.api_url, headers=self.headers, json=payload)
+            response = self.session.post(self.api_url, json=payload)
             logger.info(f"Response status: {response.status_code}")
             logger.info(f"Response content: {response.text}")
             
@@ -69,7 +68,7 @@ class StellaEndpoint(BaseEmbedding):
                         embedding_array = np.array(embedding)
                         if np.any(np.isnan(embedding_array)):
                             raise ModelServiceError("API returned NaN values in embedding")
-                        self.cache[cache_key] = embedding_array
+                        self.cache.put(text, embedding_array)
                         return embedding_array
                     else:
                         raise ModelServiceError(f"Unexpected response format: {embedding}")
@@ -85,6 +84,18 @@ class StellaEndpoint(BaseEmbedding):
             logger.error(f"Error during embedding: {str(e)}")
             raise ModelServiceError(f"Embedding generation failed: {str(e)}")
 
+    def get_embeddings_parallel(self, texts: List[str], concurrency: int = 16) -> np.ndarray:
+        """
+        Get embeddings for many texts with up to `concurrency` requests in flight at once
+        
+        Requests are sent from a thread pool over the session's pooled connections.
+        Returns a (len(texts), dimension) array whose rows follow the order of `texts`.
+        """
+        if not texts:
+            raise ValueError("texts must not be empty")
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(texts))) as executor:
+            return np.vstack(list(executor.map(self.get_embedding, texts)))
+
     def _chunk_text(self, text: str, max_tokens: int = 512) -> List[str]:
         """Split text into chunks based on token limit
         
@@ -1,8 +1,9 @@
 import os
-import numpy as np
 from tqdm import tqdm
 from pathlib import Path
 from embeddings.embedding_models.b1ade_embed import B1adeEmbed
+from embeddings.packed_embeddings import pack_embeddings, save_embedding
+from embeddings.text_preprocessing import normalize_for_embedding
 import random
 
 def create_embeddings(input_dir: str, output_dir: str, batch_size: int = 32):
@@ -12,14 +13,15 @@ def create_embeddings(input_dir: str, output_dir: str, batch_size: int = 32):
     Args:
         input_dir (str): Directory containing job description text files
         output_dir (str): Directory to save the embeddings
-        batch_size (int): Number of files to process before freeing memory
+        batch_size (int): Number of files embedded together in one forward pass
     """
     
     # Create output directory if it doesn't exist
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     
     # Get list of all txt files
-    txt_files = [f for f in os.listdir(input_dir) if f.endswith('.txt')]
+    with os.scandir(input_dir) as entries:
+        txt_files = [entry for entry in entries if entry.name.endswith('.txt')]
     
     # Randomize the file order
     random.shuffle(txt_files)
@@ -30,47 +32,68 @@ def create_embeddings(input_dir: str, output_dir: str, batch_size: int = 32):
     # Initialize the embedding model
     embedding_model = B1adeEmbed()
     
+    # Snapshot existing embeddings once instead of checking each output path,
+    # and skip them before batching so every forward pass is full of new files
+    with os.scandir(output_dir) as entries:
+        existing = {entry.name for entry in entries if entry.name.endswith('.npy')}
+    pending_files = [entry for entry in txt_files if entry.name.replace('.txt', '.npy') not in existing]
+    
     # Track processed files
     processed_count = 0
-    skipped_count = 0
+    skipped_count = total_files - len(pending_files)
     
     # Process files in batches
-    for i in tqdm(range(0, total_files, batch_size)):
-        batch_files = txt_files[i:i + batch_size]
+    for i in tqdm(range(0, len(pending_files), batch_size)):
+        batch_files = pending_files[i:i + batch_size]
         
-        for filename in batch_files:
+        batch_texts = []
+        batch_outputs = []
+        for entry in batch_files:
+            filename = entry.name
             try:
                 # Get file paths
-                input_path = os.path.join(input_dir, filename)
+                input_path = entry.path
                 output_path = os.path.join(output_dir, filename.replace('.txt', '.npy'))
                 
-                # Skip if embedding already exists
-                if os.path.exists(output_path):
-                    skipped_count += 1
-                    continue
-                
                 # Read the job description
                 with open(input_path, 'r', encoding='utf-8') as f:
-                    text = f.read().strip()
+                    text = normalize_for_embedding(f.read())
                 
                 # Skip empty files
                 if not text:
                     continue
                 
-                # Get embedding
-                embedding = embedding_model.get_embedding(text)
-                
-                # Save embedding
-                np.save(output_path, embedding)
-                
-                processed_count += 1
+                batch_texts.append(text)
+                batch_outputs.append((filename, output_path))
                 
             except Exception as e:
                 print(f"Error processing {filename}: {str(e)}")
                 continue
+        
+        if not batch_texts:
+            continue
+        
+        try:
+            # Get the whole batch's embeddings in one forward pass
+            embeddings = embedding_model.get_embeddings(batch_texts)
+        except Exception as e:
+            print(f"Error embedding batch starting at {batch_outputs[0][0]}: {str(e)}")
+            continue
+        
+        # Save each embedding as float16, keeping the (1, dim) shape of single-text embeddings
+        for row, (filename, output_path) in enumerate(batch_outputs):
+            try:
+                save_embedding(output_path, embeddings[row:row + 1])
+                processed_count += 1
+            except Exception as e:
+                print(f"Error processing {filename}: {str(e)}")
     
     print(f"Processing completed! Processed {processed_count} new files, skipped {skipped_count} existing files.")
     
+    # Refresh the packed matrix that the analysis loads in one mapping
+    packed_count = pack_embeddings(output_dir)
+    print(f"Packed {packed_count} embeddings into {os.path.join(output_dir, 'packed')}")
+    
     # Final cleanup
     B1adeEmbed.free_memory()
     print("Embedding generation completed!")
@@ -2,21 +2,25 @@ import os
 import numpy as np
 from tqdm.auto import tqdm
 from pathlib import Path
-from embeddings.embedding_models.sfr_embed_endpoint import SFREmbeddingEndpoint
+from embeddings.embedding_models.sfr_embed_endpoint import SFREmbeddingEndpoint, EMBED_BATCH_SIZE
+from embeddings.packed_embeddings import pack_embeddings, save_embedding
+from embeddings.embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from embeddings.semantic_cache import SemanticEmbeddingCache
+from embeddings.text_preprocessing import normalize_for_embedding
 from ai_systems.utils.exceptions import ModelServiceError
 import random
 import logging
 import time
 from datetime import datetime, timedelta
+import asyncio
 import concurrent.futures
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 from dataclasses import dataclass
 from queue import Queue
-import threading
 import signal
 import sys
+import aiohttp
 import backoff  # You'll need to pip install backoff
-from requests.exceptions import RequestException
 
 logging.basicConfig(
     level=logging.INFO,
@@ -33,7 +37,11 @@ class EmbeddingTask:
     filename: str
     input_path: str
     output_path: str
-    text: str
+
+@dataclass
+class EmbeddingBatch:
+    tasks: List[EmbeddingTask]
+    texts: Optional[List[str]] = None  # Read when the batch is first processed
     retries: int = 0
     max_retries: int = 3
 
@@ -43,7 +51,7 @@ def format_time(seconds):
 
 def should_retry(e):
     """Determine if the error is retryable"""
-    if isinstance(e, RequestException):
+    if isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)):
         # Retry on connection errors, timeouts, and 5xx errors
         return True
     if isinstance(e, ModelServiceError):
@@ -53,50 +61,99 @@ def should_retry(e):
 
 @backoff.on_exception(
     backoff.expo,
-    (RequestException, ModelServiceError),
+    (aiohttp.ClientError, asyncio.TimeoutError, ModelServiceError),
     max_tries=3,
     giveup=lambda e: not should_retry(e)
 )
-def get_embedding_with_retry(model: SFREmbeddingEndpoint, text: str) -> np.ndarray:
-    """Get embedding with exponential backoff retry"""
-    return model.get_embedding(text)
+async def get_embeddings_with_retry(model: SFREmbeddingEndpoint, session: aiohttp.ClientSession,
+                                    texts: List[str]) -> np.ndarray:
+    """Get a batch of embeddings with exponential backoff retry"""
+    return await model.get_embeddings_batch_async(session, texts)
+
+def read_batch_texts(batch: EmbeddingBatch) -> int:
+    """
+    Read and normalize the texts of a batch, dropping files without text
+    
+    Returns:
+        int: Number of files dropped because they were empty or unreadable
+    """
+    tasks, texts = [], []
+    for task in batch.tasks:
+        try:
+            with open(task.input_path, 'r', encoding='utf-8') as f:
+                text = normalize_for_embedding(f.read())
+        except Exception as e:
+            logger.error(f"Error reading {task.filename}: {str(e)}")
+            continue
+        if text:
+            tasks.append(task)
+            texts.append(text)
+    
+    dropped = len(batch.tasks) - len(tasks)
+    batch.tasks, batch.texts = tasks, texts
+    return dropped
+
+def save_batch(batch: EmbeddingBatch, embeddings: List[np.ndarray]) -> None:
+    """Save one float16 .npy per file of the batch"""
+    for task, embedding in zip(batch.tasks, embeddings):
+        save_embedding(task.output_path, embedding)
 
-def process_file(task: EmbeddingTask, embedding_model: SFREmbeddingEndpoint) -> Tuple[str, bool, str]:
-    """Process a single file and return results"""
+async def process_batch(batch: EmbeddingBatch, embedding_model: SFREmbeddingEndpoint,
+                        embedding_cache: EmbeddingCache, session: aiohttp.ClientSession,
+                        io_executor: concurrent.futures.Executor,
+                        semantic_cache: Optional[SemanticEmbeddingCache] = None) -> Tuple[str, bool, str]:
+    """Embed the uncached files of a batch with one request and save them off the event loop"""
     try:
-        embedding = get_embedding_with_retry(embedding_model, task.text)
-        np.save(task.output_path, embedding)
-        return task.filename, True, ""
+        texts = batch.texts
+        embeddings = embedding_cache.get_many(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        
+        if missing and semantic_cache is not None:
+            # Sketching runs a local model, so it is kept off the event loop
+            sketches = await asyncio.get_running_loop().run_in_executor(
+                None, semantic_cache.sketch, [texts[i] for i in missing])
+            near_duplicates = semantic_cache.lookup(sketches)
+            for i, embedding in zip(missing, near_duplicates):
+                embeddings[i] = embedding
+            sketches = sketches[[embedding is None for embedding in near_duplicates]]
+            missing = [i for i in missing if embeddings[i] is None]
+        
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            fetched = await get_embeddings_with_retry(embedding_model, session, missing_texts)
+            # Rows follow the request order; each file gets its row as a (1, dimension) array
+            rows = [fetched[row:row + 1] for row in range(len(missing))]
+            for i, embedding in zip(missing, rows):
+                embeddings[i] = embedding
+            embedding_cache.put_many(missing_texts, rows)
+            if semantic_cache is not None:
+                semantic_cache.add(sketches, rows)
+        
+        await asyncio.get_running_loop().run_in_executor(io_executor, save_batch, batch, embeddings)
+        return batch.tasks[0].filename, True, ""
     except Exception as e:
-        error_msg = f"Failed after {task.max_retries} retries: {str(e)}"
-        return task.filename, False, error_msg
+        error_msg = f"Failed after {batch.max_retries} retries: {str(e)}"
+        return batch.tasks[0].filename, False, error_msg
 
 def create_embedding_tasks(input_dir: str, output_dir: str) -> List[EmbeddingTask]:
-    """Create list of embedding tasks from input files"""
+    """Create list of embedding tasks from input files; texts are read per batch when it is processed"""
     tasks = []
-    for filename in os.listdir(input_dir):
-        if not filename.endswith('.txt'):
+    # Snapshot existing embeddings once instead of checking each output path
+    with os.scandir(output_dir) as entries:
+        existing = {entry.name for entry in entries if entry.name.endswith('.npy')}
+    with os.scandir(input_dir) as entries:
+        filenames = [entry.name for entry in entries if entry.name.endswith('.txt')]
+    
+    for filename in filenames:
+        output_name = filename.replace('.txt', '.npy')
+        if output_name in existing:
             continue
-            
-        input_path = os.path.join(input_dir, filename)
-        output_path = os.path.join(output_dir, filename.replace('.txt', '.npy'))
         
-        if os.path.exists(output_path):
-            continue
-            
-        try:
-            with open(input_path, 'r', encoding='utf-8') as f:
-                text = f.read().strip()
-            
-            if text:
-                tasks.append(EmbeddingTask(
-                    filename=filename,
-                    input_path=input_path,
-                    output_path=output_path,
-                    text=text
-                ))
-        except Exception as e:
-            logger.error(f"Error reading {filename}: {str(e)}")
+        tasks.append(EmbeddingTask(
+            filename=filename,
+            input_path=os.path.join(input_dir, filename),
+            output_path=os.path.join(output_dir, output_name)
+        ))
             
     return tasks
 
@@ -108,8 +165,22 @@ def signal_handler(signum, frame):
     print("\nReceived interrupt signal. Stopping gracefully...")
     stop_processing = True
 
-def create_embeddings(input_dir: str, output_dir: str, max_workers: int = 100):
-    """Create embeddings using multiple workers"""
+def create_embeddings(input_dir: str, output_dir: str, max_concurrent_requests: int = 8,
+                      batch_size: int = EMBED_BATCH_SIZE, cache_path: str = DEFAULT_CACHE_PATH,
+                      semantic_threshold: Optional[float] = None,
+                      semantic_cache_path: str = "data/job_descriptions/sfr_semantic_cache.npz"):
+    """
+    Create embeddings with concurrent batched requests on one event loop
+    
+    At most `max_concurrent_requests` batches of `batch_size` texts are in flight,
+    all sharing one endpoint instance and one pooled HTTP session. Texts already
+    embedded by any run sharing `cache_path` are read from the cache instead.
+    
+    With `semantic_threshold` set, a text whose MiniLM sketch is at least that
+    cosine-similar to an already embedded one reuses its embedding (0.86 suits
+    templated job descriptions). The saved vectors are then approximations, so
+    this is off by default.
+    """
     # Set up signal handler
     signal.signal(signal.SIGINT, signal_handler)
     
@@ -122,8 +193,9 @@ def create_embeddings(input_dir: str, output_dir: str, max_workers: int = 100):
     tasks = create_embedding_tasks(input_dir, output_dir)
     total_files = len(tasks)
     random.shuffle(tasks)
+    batches = [EmbeddingBatch(tasks=tasks[i:i + batch_size]) for i in range(0, total_files, batch_size)]
     
-    logger.info(f"Found {total_files} files to process")
+    logger.info(f"Found {total_files} files to process in {len(batches)} batches")
     
     # Initialize counters
     processed_count = 0
@@ -133,82 +205,81 @@ def create_embeddings(input_dir: str, output_dir: str, max_workers: int = 100):
     # Create progress bar
     pbar = tqdm(total=total_files, desc="Processing Files")
     
-    # Create thread-safe counters
-    counter_lock = threading.Lock()
+    # Repeated texts are served by the on-disk cache, so the shared instance keeps no in-memory one
+    embedding_model = SFREmbeddingEndpoint(use_cache=False)
+    embedding_cache = EmbeddingCache('sfr', cache_path)
+    semantic_cache = None
+    if semantic_threshold is not None:
+        semantic_cache = SemanticEmbeddingCache(semantic_cache_path, threshold=semantic_threshold)
     
-    def process_task(task: EmbeddingTask) -> Tuple[bool, str]:
-        """Process single task with dedicated model instance"""
-        if stop_processing:
-            return False, "Interrupted by user"
-            
-        model = SFREmbeddingEndpoint()
-        filename, success, error = process_file(task, model)
-        
-        nonlocal processed_count, error_count, retry_count
-        with counter_lock:
-            if success:
-                processed_count += 1
-            else:
-                if task.retries < task.max_retries:
-                    # Requeue the task
-                    task.retries += 1
-                    retry_count += 1
-                    logger.warning(f"Retrying {filename} (attempt {task.retries}/{task.max_retries})")
-                    return False, "Requeued for retry"
-                else:
-                    error_count += 1
-                    logger.error(f"Error processing {filename}: {error}")
+    async def process_task(batch: EmbeddingBatch, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                           io_executor: concurrent.futures.Executor) -> Tuple[EmbeddingBatch, bool, str]:
+        """Process a single batch, retrying it in place until it succeeds or runs out of retries"""
+        nonlocal retry_count, error_count
+        while True:
+            async with semaphore:
+                if stop_processing:
+                    return batch, False, "Interrupted by user"
+                if batch.texts is None:
+                    # Reading under the semaphore keeps only in-flight batches' texts in memory
+                    dropped = await asyncio.get_running_loop().run_in_executor(io_executor, read_batch_texts, batch)
+                    error_count += dropped
+                    pbar.update(dropped)
+                    if not batch.tasks:
+                        return batch, True, ""
+                filename, success, error = await process_batch(batch, embedding_model, embedding_cache, session,
+                                                                io_executor, semantic_cache)
             
-            # Update progress bar
-            pbar.update(1)
-            elapsed_time = time.time() - start_time
-            files_per_second = processed_count / elapsed_time if elapsed_time > 0 else 0
-            remaining_files = total_files - (processed_count + error_count)
-            eta = remaining_files / files_per_second if files_per_second > 0 else 0
+            if success or batch.retries >= batch.max_retries:
+                return batch, success, error
             
-            pbar.set_postfix({
-                'Processed': processed_count,
-                'Errors': error_count,
-                'Retries': retry_count,
-                'ETA': format_time(eta)
-            })
-        
-        return success, error
+            batch.retries += 1
+            retry_count += 1
+            logger.warning(f"Retrying batch starting at {filename} (attempt {batch.retries}/{batch.max_retries})")
+    
+    async def run():
+        """Run every batch on one event loop, updating statistics as batches finish"""
+        nonlocal processed_count, error_count
+        semaphore = asyncio.Semaphore(max_concurrent_requests)
+        connector = aiohttp.TCPConnector(limit=max_concurrent_requests, limit_per_host=max_concurrent_requests)
+        # Reading texts and saving embeddings are blocking disk I/O, so they run on a small pool
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as io_executor:
+            async with aiohttp.ClientSession(connector=connector) as session:
+                for finished in asyncio.as_completed([
+                    process_task(batch, session, semaphore, io_executor) for batch in batches
+                ]):
+                    batch, success, error = await finished
+                    if error == "Interrupted by user":
+                        continue
+                    
+                    if success:
+                        processed_count += len(batch.tasks)
+                    else:
+                        error_count += len(batch.tasks)
+                        logger.error(f"Error processing batch starting at {batch.tasks[0].filename}: {error}")
+                    
+                    # Update progress bar
+                    pbar.update(len(batch.tasks))
+                    elapsed_time = time.time() - start_time
+                    files_per_second = processed_count / elapsed_time if elapsed_time > 0 else 0
+                    remaining_files = total_files - (processed_count + error_count)
+                    eta = remaining_files / files_per_second if files_per_second > 0 else 0
+                    
+                    pbar.set_postfix({
+                        'Processed': processed_count,
+                        'Errors': error_count,
+                        'Retries': retry_count,
+                        'ETA': format_time(eta)
+                    })
 
     try:
-        # Process files using thread pool
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Initial submission of tasks
-            future_to_task = {
-                executor.submit(process_task, task): task 
-                for task in tasks
-            }
-            
-            # Process tasks and handle retries
-            while future_to_task and not stop_processing:
-                done, not_done = concurrent.futures.wait(
-                    future_to_task, 
-                    timeout=1,
-                    return_when=concurrent.futures.FIRST_COMPLETED
-                )
-                
-                for future in done:
-                    task = future_to_task.pop(future)
-                    success, error = future.result()
-                    
-                    # If task needs retry, resubmit it
-                    if error == "Requeued for retry":
-                        new_future = executor.submit(process_task, task)
-                        future_to_task[new_future] = task
-                
-                if stop_processing:
-                    # Cancel pending tasks
-                    for future in not_done:
-                        future.cancel()
-                    break
+        asyncio.run(run())
     
     finally:
         pbar.close()
+        embedding_cache.close()
+        if semantic_cache is not None:
+            semantic_cache.save()
         
         # Log final statistics
         total_time = time.time() - start_time
@@ -230,8 +301,14 @@ def create_embeddings(input_dir: str, output_dir: str, max_workers: int = 100):
             print("\nEmbedding generation completed!")
         print(f"Total time: {format_time(total_time)}")
         print(f"Check job_description_embedding.log for detailed processing information")
+    
+    if not stop_processing:
+        # Refresh the packed matrix that the analysis loads in one mapping; float16 halves
+        # the bytes of the 4096-dimensional SFR embeddings
+        packed_count = pack_embeddings(output_dir, dtype=np.float16)
+        logger.info(f"Packed {packed_count} embeddings into {os.path.join(output_dir, 'packed')}")
 
 if __name__ == "__main__":
     input_dir = "data/job_descriptions/format_txt"
     output_dir = "data/job_descriptions/sfr_embedding"
-    create_embeddings(input_dir, output_dir, max_workers=400)
\ No newline at end of file
+    create_embeddings(input_dir, output_dir, max_concurrent_requests=8)
\ No newline at end of file
@@ -0,0 +1,64 @@
+import io
+import os
+import json
+import numpy as np
+from tqdm import tqdm
+from pathlib import Path
+
+def save_embedding(path: str, embedding: np.ndarray, dtype: type = np.float16) -> None:
+    """
+    Save one embedding as a .npy file of `dtype` with a single write call
+    
+    The header and data are assembled in memory and written together. Pickling is
+    disabled, since embeddings are plain numeric arrays. float16 halves the file
+    size; every reader casts rows to its own dtype.
+    """
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, np.ascontiguousarray(embedding, dtype=dtype), allow_pickle=False)
+    with open(path, 'wb') as f:
+        f.write(buffer.getbuffer())
+
+def pack_embeddings(embedding_dir: str, dtype: type = np.float32) -> int:
+    """
+    Pack the per-job embeddings of a directory into one memory-mappable matrix
+    
+    Writes packed/matrix.npy, a (jobs, dim) array, and packed/ids.json with the
+    source file name, modification time and size of each row, so readers can map
+    every embedding with a single np.load(..., mmap_mode='r') instead of opening a
+    file per job, and can tell when a source file was rewritten after packing.
+    
+    Args:
+        embedding_dir (str): Directory containing the per-job .npy embeddings
+        dtype (type): Storage dtype of the matrix; np.float16 halves its size
+        
+    Returns:
+        int: Number of embeddings packed
+    """
+    with os.scandir(embedding_dir) as entries:
+        npy_entries = sorted((entry for entry in entries if entry.name.endswith('.npy')),
+                             key=lambda entry: entry.name)
+    if not npy_entries:
+        return 0
+    
+    packed_dir = Path(embedding_dir) / 'packed'
+    packed_dir.mkdir(parents=True, exist_ok=True)
+    # Drop the old id list first so a half-written matrix is never trusted
+    (packed_dir / 'ids.json').unlink(missing_ok=True)
+    
+    dim = np.load(npy_entries[0].path).size
+    matrix = np.lib.format.open_memmap(packed_dir / 'matrix.npy', mode='w+', dtype=dtype,
+                                       shape=(len(npy_entries), dim))
+    sources = []
+    for row, entry in enumerate(tqdm(npy_entries, desc="Packing embeddings")):
+        # Stat before reading, so a file rewritten mid-pack never looks current
+        stat = os.stat(entry.path)
+        sources.append({'id': entry.name, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size})
+        matrix[row] = np.load(entry.path).ravel()
+    matrix.flush()
+    del matrix
+    
+    # The id list is written last; readers only trust a pack whose sources are unchanged
+    with open(packed_dir / 'ids.json', 'w') as f:
+        json.dump(sources, f)
+    
+    return len(npy_entries)
@@ -3,6 +3,7 @@ import numpy as np
 from tqdm.auto import tqdm
 from pathlib import Path
 from embeddings.embedding_models.b1ade_embed import B1adeEmbed
+from embeddings.text_preprocessing import normalize_for_embedding
 from resume_parser.resume_parser_local import ResumeParser
 import random
 import logging
@@ -94,7 +95,7 @@ def process_resume_with_retry(task: EmbeddingTask) -> Tuple[bool, str]:
             
         # Get and save embedding
         logger.info(f"Generating embedding for {task.filename}")
-        embedding = models['embedding'].get_embedding(text)
+        embedding = models['embedding'].get_embedding(normalize_for_embedding(text))
         np.save(task.output_path, embedding)
         logger.info(f"Successfully generated and saved embedding for {task.filename}")
         
@@ -112,15 +113,22 @@ def create_embedding_tasks(base_path: str, output_base_path: str, txt_base_path:
         Path(output_category_path).mkdir(parents=True, exist_ok=True)
         Path(txt_category_path).mkdir(parents=True, exist_ok=True)
         
-        for pdf_file in os.listdir(category_path):
-            if not pdf_file.endswith('.pdf'):
-                continue
-                
+        # Snapshot existing outputs once instead of checking each path
+        with os.scandir(output_category_path) as entries:
+            existing_embeddings = {entry.name for entry in entries}
+        with os.scandir(txt_category_path) as entries:
+            existing_txts = {entry.name for entry in entries}
+        with os.scandir(category_path) as entries:
+            pdf_files = [entry.name for entry in entries if entry.name.endswith('.pdf')]
+        
+        for pdf_file in pdf_files:
             input_path = os.path.join(category_path, pdf_file)
-            output_path = os.path.join(output_category_path, pdf_file.replace('.pdf', '.npy'))
-            txt_path = os.path.join(txt_category_path, pdf_file.replace('.pdf', '.txt'))
+            output_name = pdf_file.replace('.pdf', '.npy')
+            txt_name = pdf_file.replace('.pdf', '.txt')
+            output_path = os.path.join(output_category_path, output_name)
+            txt_path = os.path.join(txt_category_path, txt_name)
             
-            if os.path.exists(output_path) and os.path.exists(txt_path):
+            if output_name in existing_embeddings and txt_name in existing_txts:
                 continue
                 
             tasks.append(EmbeddingTask(
@@ -158,8 +166,8 @@ def create_embeddings(input_base_dir: str, output_base_dir: str, txt_base_dir: s
             raise
         
         # Get categories and create tasks
-        categories = [d for d in os.listdir(input_base_dir) 
-                     if os.path.isdir(os.path.join(input_base_dir, d))]
+        with os.scandir(input_base_dir) as entries:
+            categories = [entry.name for entry in entries if entry.is_dir()]
         
         tasks = create_embedding_tasks(input_base_dir, output_base_dir, txt_base_dir, categories)
         total_files = len(tasks)
@@ -183,41 +191,48 @@ def create_embeddings(input_base_dir: str, output_base_dir: str, txt_base_dir: s
             try:
                 success, error = process_resume_with_retry(task)
                 
+                # Only the counters are shared; the progress bar is refreshed by the main thread
+                requeue = not success and task.retries < task.max_retries
                 with counter_lock:
                     if success:
                         processed_count += 1
-                        logger.info(f"Successfully completed processing {task.filename}")
+                    elif requeue:
+                        retry_count += 1
                     else:
-                        if task.retries < task.max_retries:
-                            task.retries += 1
-                            retry_count += 1
-                            logger.warning(f"Retrying {task.filename} (attempt {task.retries}/{task.max_retries})")
-                            return False, "Requeued for retry"
-                        else:
-                            error_count += 1
-                            logger.error(f"Error processing {task.filename}: {error}")
-                    
-                    pbar.update(1)
-                    elapsed_time = time.time() - start_time
-                    files_per_second = processed_count / elapsed_time if elapsed_time > 0 else 0
-                    remaining_files = total_files - (processed_count + error_count)
-                    eta = remaining_files / files_per_second if files_per_second > 0 else 0
-                    
-                    pbar.set_postfix({
-                        'Processed': processed_count,
-                        'Errors': error_count,
-                        'Retries': retry_count,
-                        'ETA': format_time(eta)
-                    })
+                        error_count += 1
+                
+                if requeue:
+                    task.retries += 1
+                    logger.warning(f"Retrying {task.filename} (attempt {task.retries}/{task.max_retries})")
+                    return False, "Requeued for retry"
+                if success:
+                    logger.debug(f"Successfully completed processing {task.filename}")
+                else:
+                    logger.error(f"Error processing {task.filename}: {error}")
                 
                 return success, error
             except Exception as e:
                 logger.error(f"Error in process_task for {task.filename}: {str(e)}", exc_info=True)
                 with counter_lock:
                     error_count += 1
-                    pbar.update(1)
                 return False, str(e)
         
+        def refresh_progress():
+            """Bring the progress bar up to date with the counters; called about once a second"""
+            done_count = processed_count + error_count
+            pbar.update(done_count - pbar.n)
+            elapsed_time = time.time() - start_time
+            files_per_second = processed_count / elapsed_time if elapsed_time > 0 else 0
+            remaining_files = total_files - done_count
+            eta = remaining_files / files_per_second if files_per_second > 0 else 0
+            
+            pbar.set_postfix({
+                'Processed': processed_count,
+                'Errors': error_count,
+                'Retries': retry_count,
+                'ETA': format_time(eta)
+            })
+        
         try:
             with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
                 future_to_task = {
@@ -225,6 +240,7 @@ def create_embeddings(input_base_dir: str, output_base_dir: str, txt_base_dir: s
                     for task in tasks
                 }
                 
+                last_refresh = time.time()
                 while future_to_task and not stop_processing:
                     done, not_done = concurrent.futures.wait(
                         future_to_task,
@@ -245,11 +261,17 @@ def create_embeddings(input_base_dir: str, output_base_dir: str, txt_base_dir: s
                             logger.error(f"Error processing {task.filename}: {str(e)}", exc_info=True)
                             error_count += 1
                     
+                    # Requeues need the loop to wake on every completion, so the bar is throttled here
+                    if time.time() - last_refresh >= 1:
+                        refresh_progress()
+                        last_refresh = time.time()
+                    
                     if stop_processing:
                         for future in not_done:
                             future.cancel()
                         break
         finally:
+            refresh_progress()
             pbar.close()
             # Cleanup
             B1adeEmbed.free_memory()
@@ -3,12 +3,16 @@ import numpy as np
 from tqdm.auto import tqdm
 from pathlib import Path
 from embeddings.embedding_models.b1ade_embed import B1adeEmbed
+from embeddings.text_preprocessing import normalize_for_embedding
+from embeddings.embedding_cache import EmbeddingCache
 from resume_parser.resume_parser_local import ResumeParser
 import random
 import logging
 import time
 from datetime import datetime, timedelta
 import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
 import threading
 import signal
 import backoff
@@ -37,8 +41,6 @@ class EmbeddingTask:
     input_path: str
     output_path: str
     txt_path: str
-    retries: int = 0
-    max_retries: int = 3
 
 # Add global lock for model initialization
 model_init_lock = threading.Lock()
@@ -65,42 +67,80 @@ def get_models():
                 time.sleep(random.uniform(0.5, 2.0))  # Stagger initializations
                 thread_local.models = {
                     'embedding': B1adeEmbed(),
-                    'parser': ResumeParser()
+                    'parser': ResumeParser(),
+                    # Only the single embedding thread calls this, so it owns the one cache connection
+                    'cache': EmbeddingCache('b1ade')
                 }
     return thread_local.models
 
-@backoff.on_exception(
-    backoff.expo,
-    Exception,
-    max_tries=3,
-    jitter=backoff.full_jitter,
-    base=3,
-    max_value=60
-)
-def process_resume_with_retry(task: EmbeddingTask) -> Tuple[bool, str]:
+def extract_resume_text(task: EmbeddingTask) -> Tuple[EmbeddingTask, str, str]:
+    """
+    Extract and save the text of one resume
+    
+    Runs in a parser process; returns the task with its text, or with an error message.
+    """
     try:
-        models = get_models()
-        
         # Extract text with visual processing
         logger.info(f"Starting text extraction for {task.filename}")
         text = extract_text_with_ocr(task.input_path)
         if not text or len(text.strip()) < 50:  # Minimum text length check
-            return False, "Insufficient text extracted"
+            return task, "", "Insufficient text extracted"
             
         # Save text file
         with open(task.txt_path, 'w', encoding='utf-8') as f:
             f.write(text)
         logger.info(f"Successfully extracted and saved text for {task.filename} ({len(text)} characters)")
-            
-        # Get and save embedding
-        logger.info(f"Generating embedding for {task.filename}")
-        embedding = models['embedding'].get_embedding(text)
-        np.save(task.output_path, embedding)
-        logger.info(f"Successfully generated and saved embedding for {task.filename}")
         
-        return True, ""
+        return task, text, ""
+    except Exception as e:
+        return task, "", str(e)
+
+@backoff.on_exception(
+    backoff.expo,
+    Exception,
+    max_tries=3,
+    jitter=backoff.full_jitter,
+    base=3,
+    max_value=60
+)
+def get_embeddings_with_retry(model: B1adeEmbed, texts: List[str]) -> np.ndarray:
+    """Embed a batch of texts in one forward pass, retrying with exponential backoff"""
+    return model.get_embeddings(texts)
+
+def embed_and_save(batch: List[Tuple[EmbeddingTask, str]]) -> List[Tuple[EmbeddingTask, bool, str]]:
+    """
+    Embed a batch of extracted resumes and save one embedding per resume
+    
+    Runs on the single embedding thread, which owns the model and its cache connection.
+    Texts are normalized already; cached embeddings of identical resumes are reused.
+    """
+    models = get_models()
+    tasks = [task for task, _ in batch]
+    texts = [text for _, text in batch]
+    
+    try:
+        embeddings = models['cache'].get_many(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            logger.info(f"Generating embeddings for {len(missing)} resumes")
+            missing_texts = [texts[i] for i in missing]
+            computed = get_embeddings_with_retry(models['embedding'], missing_texts)
+            # Each resume keeps the (1, dimension) shape of a single-text embedding
+            rows = [computed[row:row + 1] for row in range(len(missing))]
+            for i, embedding in zip(missing, rows):
+                embeddings[i] = embedding
+            models['cache'].put_many(missing_texts, rows)
     except Exception as e:
-        return False, str(e)
+        return [(task, False, str(e)) for task in tasks]
+    
+    results = []
+    for task, embedding in zip(tasks, embeddings):
+        try:
+            np.save(task.output_path, embedding)
+            results.append((task, True, ""))
+        except Exception as e:
+            results.append((task, False, str(e)))
+    return results
 
 def create_embedding_tasks(base_path: str, output_base_path: str, txt_base_path: str, categories: List[str]) -> List[EmbeddingTask]:
     tasks = []
@@ -112,15 +152,22 @@ def create_embedding_tasks(base_path: str, output_base_path: str, txt_base_path:
         Path(output_category_path).mkdir(parents=True, exist_ok=True)
         Path(txt_category_path).mkdir(parents=True, exist_ok=True)
         
-        for pdf_file in os.listdir(category_path):
-            if not pdf_file.endswith('.pdf'):
-                continue
-                
+        # Snapshot existing outputs once instead of checking each path
+        with os.scandir(output_category_path) as entries:
+            existing_embeddings = {entry.name for entry in entries}
+        with os.scandir(txt_category_path) as entries:
+            existing_txts = {entry.name for entry in entries}
+        with os.scandir(category_path) as entries:
+            pdf_files = [entry.name for entry in entries if entry.name.endswith('.pdf')]
+        
+        for pdf_file in pdf_files:
             input_path = os.path.join(category_path, pdf_file)
-            output_path = os.path.join(output_category_path, pdf_file.replace('.pdf', '.npy'))
-            txt_path = os.path.join(txt_category_path, pdf_file.replace('.pdf', '.txt'))
+            output_name = pdf_file.replace('.pdf', '.npy')
+            txt_name = pdf_file.replace('.pdf', '.txt')
+            output_path = os.path.join(output_category_path, output_name)
+            txt_path = os.path.join(txt_category_path, txt_name)
             
-            if os.path.exists(output_path) and os.path.exists(txt_path):
+            if output_name in existing_embeddings and txt_name in existing_txts:
                 continue
                 
             tasks.append(EmbeddingTask(
@@ -133,7 +180,20 @@ def create_embedding_tasks(base_path: str, output_base_path: str, txt_base_path:
     
     return tasks
 
-def create_embeddings(input_base_dir: str, output_base_dir: str, txt_base_dir: str, max_workers: int = 5):
+def create_embeddings(input_base_dir: str, output_base_dir: str, txt_base_dir: str,
+                      parse_workers: int = None, embed_batch_size: int = 16,
+                      max_queued_batches: int = 2):
+    """
+    Extract and embed resumes as a two-stage pipeline
+    
+    OCR text extraction runs on a pool of `parse_workers` processes (default: one per
+    CPU). Extracted texts are collected into batches of `embed_batch_size` and embedded
+    on one thread that owns the model, so parsing and embedding overlap instead of
+    alternating. Only twice `parse_workers` resumes are being parsed and at most
+    `max_queued_batches` batches wait for the model at any time, so memory stays
+    bounded regardless of the number of resumes.
+    """
+    parse_workers = parse_workers or os.cpu_count() or 1
     try:
         if not os.path.exists(input_base_dir):
             raise ValueError(f"Input directory does not exist: {input_base_dir}")
@@ -145,21 +205,9 @@ def create_embeddings(input_base_dir: str, output_base_dir: str, txt_base_dir: s
         start_time = time.time()
         logger.info(f"Starting resume embedding at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
-        # Pre-initialize models in main thread
-        logger.info("Pre-initializing models in main thread")
-        try:
-            main_models = {
-                'embedding': B1adeEmbed(),
-                'parser': ResumeParser()
-            }
-            thread_local.models = main_models
-        except Exception as e:
-            logger.error(f"Failed to initialize models: {str(e)}")
-            raise
-        
         # Get categories and create tasks
-        categories = [d for d in os.listdir(input_base_dir) 
-                     if os.path.isdir(os.path.join(input_base_dir, d))]
+        with os.scandir(input_base_dir) as entries:
+            categories = [entry.name for entry in entries if entry.is_dir()]
         
         tasks = create_embedding_tasks(input_base_dir, output_base_dir, txt_base_dir, categories)
         total_files = len(tasks)
@@ -169,86 +217,100 @@ def create_embeddings(input_base_dir: str, output_base_dir: str, txt_base_dir: s
         # Initialize counters
         processed_count = 0
         error_count = 0
-        retry_count = 0
         
         # Create progress bar
         pbar = tqdm(total=total_files, desc="Processing Resumes")
-        counter_lock = threading.Lock()
         
-        def process_task(task: EmbeddingTask) -> Tuple[bool, str]:
-            if stop_processing:
-                return False, "Interrupted by user"
-            
-            nonlocal processed_count, error_count, retry_count
-            try:
-                success, error = process_resume_with_retry(task)
-                
-                with counter_lock:
-                    if success:
-                        processed_count += 1
-                        logger.info(f"Successfully completed processing {task.filename}")
-                    else:
-                        if task.retries < task.max_retries:
-                            task.retries += 1
-                            retry_count += 1
-                            logger.warning(f"Retrying {task.filename} (attempt {task.retries}/{task.max_retries})")
-                            return False, "Requeued for retry"
-                        else:
-                            error_count += 1
-                            logger.error(f"Error processing {task.filename}: {error}")
-                    
-                    pbar.update(1)
-                    elapsed_time = time.time() - start_time
-                    files_per_second = processed_count / elapsed_time if elapsed_time > 0 else 0
-                    remaining_files = total_files - (processed_count + error_count)
-                    eta = remaining_files / files_per_second if files_per_second > 0 else 0
-                    
-                    pbar.set_postfix({
-                        'Processed': processed_count,
-                        'Errors': error_count,
-                        'Retries': retry_count,
-                        'ETA': format_time(eta)
-                    })
-                
-                return success, error
-            except Exception as e:
-                logger.error(f"Error in process_task for {task.filename}: {str(e)}", exc_info=True)
-                with counter_lock:
+        def record(results: List[Tuple[EmbeddingTask, bool, str]]) -> None:
+            """Count finished resumes and update the progress bar; only called from the main thread"""
+            nonlocal processed_count, error_count
+            for task, success, error in results:
+                if success:
+                    processed_count += 1
+                    logger.info(f"Successfully completed processing {task.filename}")
+                else:
                     error_count += 1
-                    pbar.update(1)
-                return False, str(e)
+                    logger.error(f"Error processing {task.filename}: {error}")
+                pbar.update(1)
+            
+            elapsed_time = time.time() - start_time
+            files_per_second = processed_count / elapsed_time if elapsed_time > 0 else 0
+            remaining_files = total_files - (processed_count + error_count)
+            eta = remaining_files / files_per_second if files_per_second > 0 else 0
+            
+            pbar.set_postfix({
+                'Processed': processed_count,
+                'Errors': error_count,
+                'ETA': format_time(eta)
+            })
         
         try:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_task = {
-                    executor.submit(process_task, task): task 
-                    for task in tasks
-                }
+            with concurrent.futures.ProcessPoolExecutor(max_workers=parse_workers) as parse_executor, \
+                    concurrent.futures.ThreadPoolExecutor(max_workers=1) as embed_executor:
+                # Load the models on the embedding thread before any parsing starts
+                logger.info("Initializing models on the embedding thread")
+                embed_executor.submit(get_models).result()
+                
+                task_iter = iter(tasks)
+                parse_futures = {}
+                embed_futures = []
+                batch = []
                 
-                while future_to_task and not stop_processing:
-                    done, not_done = concurrent.futures.wait(
-                        future_to_task,
+                def submit_parses() -> bool:
+                    """Top the parse pool back up to its in-flight window; returns False once the pool is broken"""
+                    for task in islice(task_iter, 2 * parse_workers - len(parse_futures)):
+                        try:
+                            parse_futures[parse_executor.submit(extract_resume_text, task)] = task
+                        except BrokenProcessPool as e:
+                            record([(task, False, f"Parser pool unavailable: {e}")])
+                            return False
+                    return True
+                
+                pool_broken = not submit_parses()
+                while parse_futures and not stop_processing:
+                    done, _ = concurrent.futures.wait(
+                        parse_futures,
                         timeout=1,
                         return_when=concurrent.futures.FIRST_COMPLETED
                     )
                     
                     for future in done:
-                        task = future_to_task.pop(future)
+                        task = parse_futures.pop(future)
                         try:
-                            success, error = future.result()
-                            if error == "Requeued for retry":
-                                new_future = executor.submit(process_task, task)
-                                future_to_task[new_future] = task
-                        except concurrent.futures.CancelledError:
-                            logger.warning(f"Task cancelled for {task.filename}")
-                        except Exception as e:
-                            logger.error(f"Error processing {task.filename}: {str(e)}", exc_info=True)
-                            error_count += 1
+                            task, text, error = future.result()
+                        except BrokenProcessPool as e:
+                            # A parser process died (e.g. OCR crashed or was OOM-killed)
+                            pool_broken = True
+                            text, error = "", f"Parser process terminated abruptly: {e}"
+                        
+                        if error:
+                            record([(task, False, error)])
+                        else:
+                            batch.append((task, normalize_for_embedding(text)))
+                            if len(batch) == embed_batch_size:
+                                # Wait for the oldest batch rather than letting texts pile up behind the model
+                                if len(embed_futures) >= max_queued_batches:
+                                    record(embed_futures.pop(0).result())
+                                # Queued batches keep the embedding thread busy while parsing continues
+                                embed_futures.append(embed_executor.submit(embed_and_save, batch))
+                                batch = []
                     
-                    if stop_processing:
-                        for future in not_done:
-                            future.cancel()
-                        break
+                    while embed_futures and embed_futures[0].done():
+                        record(embed_futures.pop(0).result())
+                    
+                    # A broken pool rejects new work; the remaining tasks are reported as skipped
+                    if not pool_broken:
+                        pool_broken = not submit_parses()
+                
+                if stop_processing:
+                    for future in parse_futures:
+                        future.cancel()
+                elif batch:
+                    embed_futures.append(embed_executor.submit(embed_and_save, batch))
+                
+                # Batches already handed to the embedding thread are finished and saved
+                for future in embed_futures:
+                    record(future.result())
         finally:
             pbar.close()
             # Cleanup
@@ -264,7 +326,6 @@ def create_embeddings(input_base_dir: str, output_base_dir: str, txt_base_dir: s
             logger.info(f"- Processed: {processed_count} files")
             logger.info(f"- Errors: {error_count} files")
             logger.info(f"- Skipped: {skipped} files")
-            logger.info(f"- Total retries: {retry_count}")
             logger.info(f"- Processing rate: {processed_count / total_time:.2f} files/second")
             logger.info(f"- Completion rate: {completion_rate:.2f}%")
             
@@ -329,7 +390,7 @@ if __name__ == "__main__":
         logger.info(f"Output directory: {output_dir}")
         logger.info(f"Text directory: {txt_dir}")
         
-        create_embeddings(input_dir, output_dir, txt_dir, max_workers=3)
+        create_embeddings(input_dir, output_dir, txt_dir)
         
     except KeyboardInterrupt:
         logger.error("Script interrupted by user")
@@ -2,7 +2,8 @@ import os
 import numpy as np
 from tqdm.auto import tqdm
 from pathlib import Path
-from embeddings.embedding_models.sfr_embed_endpoint import SFREmbeddingEndpoint
+from embeddings.embedding_models.sfr_embed_endpoint import SFREmbeddingEndpoint, HTTP_POOL_SIZE
+from embeddings.text_preprocessing import normalize_for_embedding
 from ai_systems.utils.exceptions import ModelServiceError
 import random
 import logging
@@ -33,9 +34,6 @@ class EmbeddingTask:
     category: str
     input_path: str
     output_path: str
-    text: str
-    retries: int = 0
-    max_retries: int = 3
 
 # Global variables
 stop_processing = False
@@ -57,8 +55,11 @@ def format_time(seconds):
 @backoff.on_exception(
     backoff.expo,
     (RequestException, ModelServiceError),
-    max_tries=3,
-    giveup=lambda e: isinstance(e, ModelServiceError) and "rate limit" in str(e).lower()
+    max_tries=5,
+    jitter=backoff.full_jitter,
+    factor=0.5,
+    # Rate limits and overloads are retried with jitter; an over-long input never succeeds
+    giveup=lambda e: "must have less than 4096 tokens" in str(e)
 )
 def get_embedding_with_retry(model: SFREmbeddingEndpoint, text: str) -> np.ndarray:
     """Get embedding with exponential backoff retry"""
@@ -113,10 +114,17 @@ def split_text(text: str, max_tokens: int = 2500) -> List[str]:
     return chunks
 
 def process_file(task: EmbeddingTask, embedding_model: SFREmbeddingEndpoint) -> Tuple[str, bool, str]:
-    """Process a single file and return results"""
+    """Read, embed and save a single file and return results"""
     try:
+        # Texts are read here rather than when listing tasks, so only in-flight files are held in memory
+        with open(task.input_path, 'r', encoding='utf-8') as f:
+            # No truncation: long resumes are split into chunks by split_text
+            text = normalize_for_embedding(f.read(), max_chars=None)
+        if not text:
+            return task.filename, False, "Empty text file"
+        
         # Split text into chunks
-        chunks = split_text(task.text)
+        chunks = split_text(text)
         
         if len(chunks) > 1:
             logger.info(f"Split {task.category}/{task.filename} into {len(chunks)} chunks")
@@ -150,51 +158,52 @@ def process_file(task: EmbeddingTask, embedding_model: SFREmbeddingEndpoint) ->
             return task.filename, True, ""
             
     except Exception as e:
-        error_msg = f"Failed after {task.max_retries} retries: {str(e)}"
-        return task.filename, False, error_msg
+        return task.filename, False, str(e)
 
 def create_embedding_tasks(input_base_dir: str, output_base_dir: str) -> Tuple[List[EmbeddingTask], int]:
-    """Create list of embedding tasks from input files"""
+    """Create list of embedding tasks from input files; texts are read by the workers"""
     tasks = []
     skipped_count = 0
-    categories = [d for d in os.listdir(input_base_dir) 
-                 if os.path.isdir(os.path.join(input_base_dir, d))]
+    with os.scandir(input_base_dir) as entries:
+        categories = [entry.name for entry in entries if entry.is_dir()]
     
     for category in categories:
         category_path = os.path.join(input_base_dir, category)
         output_category_path = os.path.join(output_base_dir, category)
         Path(output_category_path).mkdir(parents=True, exist_ok=True)
         
-        for filename in os.listdir(category_path):
-            if not filename.endswith('.txt'):
-                continue
-                
+        # Snapshot existing embeddings once instead of checking each output path
+        with os.scandir(output_category_path) as entries:
+            existing = {entry.name for entry in entries if entry.name.endswith('.npy')}
+        with os.scandir(category_path) as entries:
+            filenames = [entry.name for entry in entries if entry.name.endswith('.txt')]
+        
+        for filename in filenames:
             input_path = os.path.join(category_path, filename)
-            output_path = os.path.join(output_category_path, filename.replace('.txt', '.npy'))
+            output_name = filename.replace('.txt', '.npy')
+            output_path = os.path.join(output_category_path, output_name)
             
-            if os.path.exists(output_path):
+            if output_name in existing:
                 skipped_count += 1
                 continue
-                
-            try:
-                with open(input_path, 'r', encoding='utf-8') as f:
-                    text = f.read().strip()
-                
-                if text:
-                    tasks.append(EmbeddingTask(
-                        filename=filename,
-                        category=category,
-                        input_path=input_path,
-                        output_path=output_path,
-                        text=text
-                    ))
-            except Exception as e:
-                logger.error(f"Error reading {filename} in {category}: {str(e)}")
+            
+            tasks.append(EmbeddingTask(
+                filename=filename,
+                category=category,
+                input_path=input_path,
+                output_path=output_path
+            ))
                 
     return tasks, skipped_count
 
-def create_embeddings(input_dir: str, output_dir: str, max_workers: int = 100):
-    """Create embeddings using multiple workers"""
+def create_embeddings(input_dir: str, output_dir: str, max_workers: int = HTTP_POOL_SIZE):
+    """
+    Create embeddings using multiple workers
+    
+    All workers share one endpoint, whose session pools connections across threads.
+    Failed requests are retried by get_embedding_with_retry. At most twice
+    `max_workers` tasks are submitted at a time, topped up as they finish.
+    """
     signal.signal(signal.SIGINT, signal_handler)
     
     start_time = time.time()
@@ -210,80 +219,77 @@ def create_embeddings(input_dir: str, output_dir: str, max_workers: int = 100):
     
     processed_count = 0
     error_count = 0
-    retry_count = 0
     
     pbar = tqdm(total=total_files, desc="Processing Resumes")
     
+    # One endpoint for all workers; results are written to disk, so its in-memory cache is off
+    model = SFREmbeddingEndpoint(use_cache=False)
+    
     def process_task(task: EmbeddingTask) -> Tuple[bool, str]:
         if stop_processing:
             return False, "Interrupted by user"
-            
-        try:
-            model = SFREmbeddingEndpoint()
-        except Exception as e:
-            logger.error(f"Error initializing model: {str(e)}")
-            return False, f"Model initialization failed: {str(e)}"
         
         filename, success, error = process_file(task, model)
         
-        nonlocal processed_count, error_count, retry_count
+        # Only the counters are shared; the progress bar is refreshed by the main thread
+        nonlocal processed_count, error_count
         with counter_lock:
             if success:
                 processed_count += 1
-                logger.info(f"Successfully processed {task.category}/{task.filename}")
             else:
-                if task.retries < task.max_retries:
-                    task.retries += 1
-                    retry_count += 1
-                    logger.warning(f"Retrying {task.category}/{task.filename} (attempt {task.retries}/{task.max_retries})")
-                    return False, "Requeued for retry"
-                else:
-                    error_count += 1
-                    logger.error(f"Error processing {task.category}/{task.filename}: {error}")
-            
-            pbar.update(1)
-            elapsed_time = time.time() - start_time
-            files_per_second = processed_count / elapsed_time if elapsed_time > 0 else 0
-            remaining_files = total_files - (processed_count + error_count)
-            eta = remaining_files / files_per_second if files_per_second > 0 else 0
-            
-            pbar.set_postfix({
-                'Processed': processed_count,
-                'Errors': error_count,
-                'Retries': retry_count,
-                'ETA': format_time(eta)
-            })
+                error_count += 1
+        
+        if success:
+            logger.debug(f"Successfully processed {task.category}/{task.filename}")
+        else:
+            logger.error(f"Error processing {task.category}/{task.filename}: {error}")
         
         return success, error
+    
+    def refresh_progress():
+        """Bring the progress bar up to date with the counters; called about once a second"""
+        done_count = processed_count + error_count
+        pbar.update(done_count - pbar.n)
+        elapsed_time = time.time() - start_time
+        files_per_second = processed_count / elapsed_time if elapsed_time > 0 else 0
+        remaining_files = total_files - done_count
+        eta = remaining_files / files_per_second if files_per_second > 0 else 0
+        
+        pbar.set_postfix({
+            'Processed': processed_count,
+            'Errors': error_count,
+            'ETA': format_time(eta)
+        })
 
     try:
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_task = {
-                executor.submit(process_task, task): task 
-                for task in tasks
-            }
-            
-            while future_to_task and not stop_processing:
-                done, not_done = concurrent.futures.wait(
-                    future_to_task, 
+            pending_tasks = iter(tasks)
+            not_done = set()
+            last_refresh = time.time()
+            while not stop_processing:
+                # Bounded submission keeps the executor queue, and the texts read for it, small
+                for task in pending_tasks:
+                    not_done.add(executor.submit(process_task, task))
+                    if len(not_done) >= max_workers * 2:
+                        break
+                if not not_done:
+                    break
+                
+                _, not_done = concurrent.futures.wait(
+                    not_done,
                     timeout=1,
                     return_when=concurrent.futures.FIRST_COMPLETED
                 )
-                
-                for future in done:
-                    task = future_to_task.pop(future)
-                    success, error = future.result()
-                    
-                    if error == "Requeued for retry":
-                        new_future = executor.submit(process_task, task)
-                        future_to_task[new_future] = task
-                
-                if stop_processing:
-                    for future in not_done:
-                        future.cancel()
-                    break
+                if time.time() - last_refresh >= 1:
+                    refresh_progress()
+                    last_refresh = time.time()
+            
+            if stop_processing:
+                for future in not_done:
+                    future.cancel()
     
     finally:
+        refresh_progress()
         pbar.close()
         
         total_time = time.time() - start_time
@@ -294,7 +300,6 @@ def create_embeddings(input_dir: str, output_dir: str, max_workers: int = 100):
         logger.info(f"- Total time: {format_time(total_time)}")
         logger.info(f"- Processed: {processed_count} files")
         logger.info(f"- Errors: {error_count} files")
-        logger.info(f"- Total retries: {retry_count}")
         logger.info(f"- Processing rate: {processed_count / total_time:.2f} files/second")
         logger.info(f"- Completion rate: {completion_rate:.2f}%")
         
@@ -314,4 +319,4 @@ if __name__ == "__main__":
     logger.info(f"Input directory: {input_dir}")
     logger.info(f"Output directory: {output_dir}")
     
-    create_embeddings(input_dir, output_dir, max_workers=400)
\ No newline at end of file
+    create_embeddings(input_dir, output_dir)
\ No newline at end of file
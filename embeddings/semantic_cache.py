@@ -0,0 +1,68 @@
+import os
+import numpy as np
+from pathlib import Path
+from typing import List, Optional
+
+SKETCH_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+class SemanticEmbeddingCache:
+    """
+    Near-duplicate cache that reuses the embedding of a similar, already embedded text
+
+    Every text gets a cheap sketch from a small local model. Sketches are clustered
+    online: a text whose sketch has cosine similarity of at least `threshold` with a
+    cluster center reuses that cluster's stored embedding, and any other text starts
+    a new cluster once its embedding is known. A cluster's center is the sketch of
+    the text that started it, so stored embeddings never drift from the text they
+    were computed for.
+    """
+    def __init__(self, path: str, threshold: float = 0.86, sketch_model_name: str = SKETCH_MODEL_NAME):
+        """
+        Args:
+            path: .npz file the clusters are loaded from and saved to
+            threshold: Minimum sketch cosine similarity for reusing a cluster's embedding
+            sketch_model_name: SentenceTransformer model used for the sketches
+        """
+        self.path = path
+        self.threshold = threshold
+        # Imported here so the embedders load without sentence_transformers while the cache is off
+        from sentence_transformers import SentenceTransformer
+        self.sketch_model = SentenceTransformer(sketch_model_name)
+        self.centers = None  # (clusters, sketch dimension) normalized sketches
+        self.embeddings = []  # Stored embedding of each cluster, aligned with centers
+
+        if os.path.exists(path):
+            with np.load(path) as data:
+                self.centers = data['centers']
+                self.embeddings = list(data['embeddings'])
+
+    def sketch(self, texts: List[str]) -> np.ndarray:
+        """Normalized (len(texts), sketch dimension) sketches of the texts"""
+        return self.sketch_model.encode(texts, normalize_embeddings=True, convert_to_numpy=True,
+                                        show_progress_bar=False).astype(np.float32, copy=False)
+
+    def lookup(self, sketches: np.ndarray) -> List[Optional[np.ndarray]]:
+        """Return the stored embedding of the closest cluster for each sketch, or None below the threshold"""
+        if self.centers is None:
+            return [None] * len(sketches)
+
+        # Sketches and centers are normalized, so one matmul gives every cosine similarity
+        similarities = sketches @ self.centers.T
+        best = similarities.argmax(axis=1)
+        hits = similarities[np.arange(len(sketches)), best] >= self.threshold
+        return [self.embeddings[cluster] if hit else None for cluster, hit in zip(best.tolist(), hits.tolist())]
+
+    def add(self, sketches: np.ndarray, embeddings: List[np.ndarray]) -> None:
+        """Start one cluster per sketch with its embedding"""
+        self.centers = sketches if self.centers is None else np.vstack([self.centers, sketches])
+        self.embeddings.extend(embeddings)
+
+    def save(self) -> None:
+        """Write the clusters to `path`, replacing the previous file in one rename"""
+        if self.centers is None:
+            return
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, centers=self.centers, embeddings=np.stack(self.embeddings))
+        os.replace(tmp_path, self.path)
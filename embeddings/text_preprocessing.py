@@ -0,0 +1,21 @@
+from typing import Optional
+
+# Keeps even a two-characters-per-token text under the SFR endpoint's 4096-token limit;
+# local models still truncate to their own token limit
+MAX_EMBEDDING_CHARS = 8000
+
+def normalize_for_embedding(text: str, max_chars: Optional[int] = MAX_EMBEDDING_CHARS) -> str:
+    """
+    Collapse runs of whitespace and truncate the text to at most `max_chars` characters
+
+    Repeated blank lines and indentation from PDF extraction carry no meaning for the
+    embedding but inflate tokenization and request payloads. Truncation ends at a word
+    boundary; pass max_chars=None to keep the full text (e.g. when the caller chunks it).
+    The original casing and punctuation are kept, since the models are sensitive to both.
+    """
+    text = " ".join(text.split())
+    if max_chars is not None and len(text) > max_chars:
+        # One extra character shows whether the cut falls exactly on a word boundary
+        cut = text[:max_chars + 1]
+        text = cut.rsplit(' ', 1)[0] if ' ' in cut else text[:max_chars]
+    return text